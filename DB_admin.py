@@ -2,6 +2,7 @@ import bcrypt
 import sqlite3
 import logging
 import os
+from db_pool import get_connection, close_connection
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
@@ -20,23 +21,23 @@ class DBAdmin:
     # Connect to the SQLite database
     def db_connect(self):
         try:
-            return sqlite3.connect(DB_ADMIN_PATH)
+            return get_connection(DB_ADMIN_PATH)
         except sqlite3.Error as e:
             logging.error(f"Error connecting to database: {e}")
             return None
+
+    # Close this thread's connection to the database
+    def db_close(self):
+        close_connection(DB_ADMIN_PATH)
         
     # Execute a SQL query
     def db_execute(self, query, params=None, fetch=False):
         try:
+            # The connection is persistent; the with block only scopes the transaction
             with self.db_connect() as conn:
-                cursor = conn.cursor()
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-            if fetch:
-                return cursor.fetchall()
-            conn.commit()
+                cursor = conn.execute(query, params or ())
+                if fetch:
+                    return cursor.fetchall()
         except sqlite3.Error as e:
             logging.error(f"Error executing query: {e}")
             return None
@@ -1,7 +1,10 @@
 import sqlite3 
+import csv
 from datetime import datetime
 import logging
 import os
+import threading
+from db_pool import get_connection, close_connection
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
@@ -10,54 +13,158 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(me
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "data")
 DB_STUDENT_PATH = os.path.join(DATA_DIR, "students.db")
+# Stored in PRAGMA user_version; 1 is the normalized students/attendance schema,
+# 2 adds the trigger-maintained attendance summary and change counter
+SCHEMA_VERSION = 2
+# Dates of one student in ascending order, joined the way the reports show them
+STUDENT_DATES_SQL = "(SELECT group_concat(date, ' ; ') FROM (SELECT date FROM attendance WHERE student_id = {student} ORDER BY date))"
+# Header names recognized as the student name column of a CSV roster
+ROSTER_NAME_COLUMNS = ("student_name", "name", "student", "full_name")
 
 """
     This class handles the administration of the SQLite database,
     including connecting to the database, executing SQL queries, 
-    and initializing the student table.
+    and initializing the students and attendance tables.
 """
 class DBmanagement: 
+    # Students already marked present today, shared by every instance in the process
+    recorded_today = set()
+    recorded_date = None
+    recorded_lock = threading.Lock()
+
     # Connect to the database
     def db_connect(self):
         try:
-            return sqlite3.connect(DB_STUDENT_PATH)
+            return get_connection(DB_STUDENT_PATH)
         except Exception as e:
             logging.error(f"Error: {e}")
             return None
+
+    # Close this thread's connection to the database
+    def db_close(self):
+        close_connection(DB_STUDENT_PATH)
         
     # Execute a database query
     def db_execute(self, query, params=None, fetch=False):
         try:
+            # The connection is persistent; the with block only scopes the transaction
             with self.db_connect() as conn:
-                cursor = conn.cursor()
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-            if fetch:
-                return cursor.fetchall()
-            conn.commit()
+                cursor = conn.execute(query, params or ())
+                if fetch:
+                    return cursor.fetchall()
         except sqlite3.Error as e:
             logging.error(f"Error executing query: {e}")
             return None
             
-    # Initialize the students table
+    # Initialize the students and attendance tables, migrating the legacy schema if needed
     def db_students_init(self):
         try:
-            table = '''CREATE TABLE IF NOT EXISTS STUDENTS (
-                        Id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        Student_name TEXT NOT NULL,
-                        Date TEXT DEFAULT NULL 
-                        );'''
-            self.db_execute(table)
+            conn = self.db_connect()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                version = conn.execute('PRAGMA user_version').fetchone()[0]
+                if version < SCHEMA_VERSION:
+                    self.db_migrate(conn, version)
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
         except sqlite3.Error as e:
             logging.error(f"Error creating table: {e}")
             return None
-    
+
+    # Bring the schema from the given version up to SCHEMA_VERSION
+    def db_migrate(self, conn, version):
+        if version < 1:
+            self.db_migrate_v1(conn)
+        if version < 2:
+            self.db_migrate_v2(conn)
+        conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    # Create the normalized schema and move the rows of the legacy STUDENTS table into it
+    def db_migrate_v1(self, conn):
+        columns = [row[1] for row in conn.execute('PRAGMA table_info(STUDENTS)')]
+        # Table names are case-insensitive, so the legacy table is renamed out of the way first
+        legacy = 'Date' in columns
+        if legacy:
+            conn.execute('ALTER TABLE STUDENTS RENAME TO students_legacy')
+        conn.execute('''CREATE TABLE IF NOT EXISTS students (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        name TEXT NOT NULL UNIQUE
+                        );''')
+        conn.execute('''CREATE TABLE IF NOT EXISTS attendance (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        student_id INTEGER NOT NULL REFERENCES students(id) ON DELETE CASCADE,
+                        date TEXT NOT NULL,
+                        UNIQUE (student_id, date)
+                        );''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_attendance_date ON attendance (date)')
+        if legacy:
+            conn.execute('''INSERT OR IGNORE INTO students (name)
+                            SELECT Student_name FROM students_legacy GROUP BY Student_name ORDER BY MIN(Id)''')
+            conn.execute('''INSERT OR IGNORE INTO attendance (student_id, date)
+                            SELECT s.id, l.Date FROM students_legacy l
+                            JOIN students s ON s.name = l.Student_name
+                            WHERE l.Date IS NOT NULL ORDER BY l.Id''')
+            conn.execute('DROP TABLE students_legacy')
+            students, attendance = (conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0] for table in ('students', 'attendance'))
+            logging.info(f"Migrated students.db to schema 1: {students} students, {attendance} attendance records")
+
+    # Add the per-student attendance summary and the change counter, both kept up to date by triggers
+    def db_migrate_v2(self, conn):
+        conn.execute('''CREATE TABLE IF NOT EXISTS attendance_summary (
+                        student_id INTEGER PRIMARY KEY REFERENCES students(id) ON DELETE CASCADE,
+                        attendance_count INTEGER NOT NULL DEFAULT 0,
+                        last_seen TEXT,
+                        dates TEXT NOT NULL DEFAULT ''
+                        );''')
+        conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+        conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('attendance_changes', 0)")
+        bump = "UPDATE meta SET value = value + 1 WHERE key = 'attendance_changes';"
+        conn.execute(f'''CREATE TRIGGER IF NOT EXISTS students_summary_insert AFTER INSERT ON students BEGIN
+                         INSERT OR IGNORE INTO attendance_summary (student_id) VALUES (NEW.id);
+                         {bump}
+                         END;''')
+        conn.execute(f'''CREATE TRIGGER IF NOT EXISTS students_summary_rename AFTER UPDATE OF name ON students BEGIN
+                         {bump}
+                         END;''')
+        conn.execute(f'''CREATE TRIGGER IF NOT EXISTS students_summary_delete AFTER DELETE ON students BEGIN
+                         DELETE FROM attendance_summary WHERE student_id = OLD.id;
+                         {bump}
+                         END;''')
+        # A date later than the last one is appended; an older one (manual entry) rebuilds the list
+        conn.execute(f'''CREATE TRIGGER IF NOT EXISTS attendance_summary_insert AFTER INSERT ON attendance BEGIN
+                         INSERT OR IGNORE INTO attendance_summary (student_id) VALUES (NEW.student_id);
+                         UPDATE attendance_summary SET
+                             attendance_count = attendance_count + 1,
+                             last_seen = MAX(COALESCE(last_seen, ''), NEW.date),
+                             dates = CASE WHEN last_seen IS NULL THEN NEW.date
+                                          WHEN NEW.date > last_seen THEN dates || ' ; ' || NEW.date
+                                          ELSE {STUDENT_DATES_SQL.format(student='NEW.student_id')} END
+                         WHERE student_id = NEW.student_id;
+                         {bump}
+                         END;''')
+        conn.execute(f'''CREATE TRIGGER IF NOT EXISTS attendance_summary_delete AFTER DELETE ON attendance BEGIN
+                         UPDATE attendance_summary SET
+                             attendance_count = attendance_count - 1,
+                             last_seen = (SELECT MAX(date) FROM attendance WHERE student_id = OLD.student_id),
+                             dates = COALESCE({STUDENT_DATES_SQL.format(student='OLD.student_id')}, '')
+                         WHERE student_id = OLD.student_id;
+                         {bump}
+                         END;''')
+        conn.execute(f'''INSERT OR REPLACE INTO attendance_summary (student_id, attendance_count, last_seen, dates)
+                         SELECT s.id,
+                                (SELECT COUNT(*) FROM attendance WHERE student_id = s.id),
+                                (SELECT MAX(date) FROM attendance WHERE student_id = s.id),
+                                COALESCE({STUDENT_DATES_SQL.format(student='s.id')}, '')
+                         FROM students s''')
+        students = conn.execute('SELECT COUNT(*) FROM attendance_summary').fetchone()[0]
+        logging.info(f"Migrated students.db to schema 2: attendance summary built for {students} students")
+
     # Get all students from the database
     def db_get_students(self):
         try:
-            return self.db_execute('SELECT * FROM STUDENTS ORDER BY Student_name ASC', fetch=True)
+            return self.db_execute('SELECT id, name FROM students ORDER BY name ASC', fetch=True)
         except sqlite3.Error as e:
             logging.error(f"Error fetching students: {e}")
             return None
@@ -68,7 +175,10 @@ class DBmanagement:
             if not student_name:
                 raise ValueError("Student name must be provided")
             self.student_name = student_name
-            return self.db_execute('DELETE FROM STUDENTS WHERE Student_name = ?', (self.student_name,))
+            with DBmanagement.recorded_lock:
+                DBmanagement.recorded_today.discard(self.student_name)
+            # The attendance rows are removed by the foreign key cascade
+            return self.db_execute('DELETE FROM students WHERE name = ?', (self.student_name,))
         except sqlite3.Error as e:
             logging.error(f"Error deleting student: {e}")
             return None
@@ -77,8 +187,8 @@ class DBmanagement:
     def db_check_student(self, name):
         try:
             self.name = name
-            students = self.db_execute('SELECT Student_name FROM STUDENTS ORDER BY Student_name ASC', fetch=True)
-            return any(student[0] == self.name for student in students)
+            students = self.db_execute('SELECT 1 FROM students WHERE name = ?', (self.name,), fetch=True)
+            return bool(students)
         except sqlite3.Error as e:
             logging.error(f"Error checking student: {e}")
             return None
@@ -86,53 +196,214 @@ class DBmanagement:
     # Add a new student to the database
     def db_add_student(self, name):
         try:
-            date = None
-            self.db_execute('INSERT INTO STUDENTS (Student_name, Date) VALUES (?, ?)', (name, date))
+            self.db_execute('INSERT OR IGNORE INTO students (name) VALUES (?)', (name,))
         except sqlite3.Error as e:
             logging.error(f"Error adding student: {e}")
             return None
 
+    # Add many students in a single transaction and return the (inserted, skipped) counts
+    def db_add_students(self, names):
+        try:
+            # Dedupe in memory, keeping the first occurrence order
+            unique_names = list(dict.fromkeys(name.strip() for name in names if name and name.strip()))
+            with self.db_connect() as conn:
+                # rowcount only counts the inserted students, not the rows changed by the summary triggers
+                inserted = conn.executemany('INSERT OR IGNORE INTO students (name) VALUES (?)', ((name,) for name in unique_names)).rowcount
+            total = sum(1 for name in names if name and name.strip())
+            return inserted, total - inserted
+        except sqlite3.Error as e:
+            logging.error(f"Error adding students: {e}")
+            return None
+
+    # Read the names of a roster file: one name per line, or a CSV with a name column
+    def read_roster(self, file_path):
+        with open(file_path, 'r', newline='', encoding='utf-8-sig') as file:
+            if not file_path.lower().endswith('.csv'):
+                return [line.strip() for line in file]
+            rows = csv.reader(file)
+            header = next(rows, None)
+            if header is None:
+                return []
+            columns = [column.strip().lower() for column in header]
+            for candidate in ROSTER_NAME_COLUMNS:
+                if candidate in columns:
+                    index = columns.index(candidate)
+                    return [row[index] for row in rows if len(row) > index]
+            # No recognizable header: the first column holds the names
+            return [row[0] for row in [header, *rows] if row]
+
+    # Import a roster file into the database and return the (inserted, skipped) counts
+    def db_import_students(self, file_path):
+        try:
+            names = self.read_roster(file_path)
+        except (OSError, csv.Error, UnicodeDecodeError) as e:
+            logging.error(f"Error reading roster {file_path}: {e}")
+            return None
+        result = self.db_add_students(names)
+        if result is not None:
+            logging.info(f"Imported roster {file_path}: {result[0]} inserted, {result[1]} skipped")
+        return result
+
     # Update a student's name in the database
     def db_update_student(self, old_name, new_name):
         try:
             self.old_name = old_name
             self.new_name = new_name
-            params = (self.new_name, self.old_name)
-            return self.db_execute('UPDATE STUDENTS SET Student_name = ? WHERE Student_name = ?', params)
+            if self.old_name == self.new_name:
+                return None
+            with self.db_connect() as conn:
+                if conn.execute('SELECT 1 FROM students WHERE name = ?', (self.new_name,)).fetchone():
+                    # Renaming onto an existing student merges their attendance
+                    conn.execute('''INSERT OR IGNORE INTO attendance (student_id, date)
+                                    SELECT (SELECT id FROM students WHERE name = ?), date FROM attendance
+                                    WHERE student_id = (SELECT id FROM students WHERE name = ?)''', (self.new_name, self.old_name))
+                    conn.execute('DELETE FROM students WHERE name = ?', (self.old_name,))
+                else:
+                    conn.execute('UPDATE students SET name = ? WHERE name = ?', (self.new_name, self.old_name))
+            # The cache follows the rename only once it is committed
+            with DBmanagement.recorded_lock:
+                if self.old_name in DBmanagement.recorded_today:
+                    DBmanagement.recorded_today.discard(self.old_name)
+                    DBmanagement.recorded_today.add(self.new_name)
         except sqlite3.Error as e:
             logging.error(f"Error updating the student name: {e}")
             return None
 
+    # Insert an attendance record and return True if it did not exist yet
+    def db_insert_attendance(self, cursor, student_name, date):
+        cursor.execute('INSERT OR IGNORE INTO students (name) VALUES (?)', (student_name,))
+        cursor.execute('''INSERT OR IGNORE INTO attendance (student_id, date)
+                          SELECT id, ? FROM students WHERE name = ?''', (date, student_name))
+        return cursor.rowcount == 1
+
+    # Return the students marked present on the given day, reloading the set when the day changes
+    # (the caller must hold recorded_lock)
+    def db_recorded_today(self, date):
+        if DBmanagement.recorded_date != date:
+            rows = self.db_execute('SELECT s.name FROM attendance a JOIN students s ON s.id = a.student_id WHERE a.date = ?', (date,), fetch=True)
+            if rows is None:
+                raise sqlite3.Error("Could not load today's attendance")
+            DBmanagement.recorded_today = {row[0] for row in rows}
+            DBmanagement.recorded_date = date
+            logging.info(f"Attendance cache loaded with {len(DBmanagement.recorded_today)} students for {date}")
+        return DBmanagement.recorded_today
+
+    # Warm the in-memory attendance set for today
+    def db_warm_attendance_cache(self):
+        try:
+            with DBmanagement.recorded_lock:
+                self.db_recorded_today(datetime.now().strftime("%Y-%m-%d"))
+        except sqlite3.Error as e:
+            logging.error(f"Error warming attendance cache: {e}")
+
     # Record attendance for a student
     def db_record_attendance(self, student_name):
         try:
             date = datetime.now().strftime("%Y-%m-%d")
-            check = self.db_execute('SELECT COUNT(*) FROM STUDENTS WHERE student_name = ? AND date = ?', (student_name, date), fetch=True)
-            if not check[0][0]:
-                self.db_execute('INSERT INTO STUDENTS (Student_name, Date) VALUES (?, ?)', (student_name, date))
-                return True
-            else:
-                return False
+            with DBmanagement.recorded_lock:
+                recorded_today = self.db_recorded_today(date)
+                # Repeat recognitions are answered without touching SQLite
+                if student_name in recorded_today:
+                    return False
+                with self.db_connect() as conn:
+                    recorded = self.db_insert_attendance(conn.cursor(), student_name, date)
+                recorded_today.add(student_name)
+                return recorded
         except sqlite3.Error as e:
             logging.error(f"Error recording attendance: {e}")
             return None
-        
+
+    # Record attendance for several students in a single transaction (today unless a date is given)
+    def db_record_attendance_batch(self, student_names, date=None):
+        try:
+            today = datetime.now().strftime("%Y-%m-%d")
+            date = date or today
+            results = []
+            with DBmanagement.recorded_lock:
+                # Only today's attendance is cached in memory
+                recorded_today = self.db_recorded_today(today) if date == today else set()
+                # Repeat recognitions are answered without touching SQLite
+                if all(name in recorded_today for name in student_names):
+                    return [False] * len(student_names)
+                recorded = []
+                with self.db_connect() as conn:
+                    cursor = conn.cursor()
+                    for student_name in student_names:
+                        if student_name in recorded_today or student_name in recorded:
+                            results.append(False)
+                            continue
+                        results.append(self.db_insert_attendance(cursor, student_name, date))
+                        recorded.append(student_name)
+                # The cache is only updated once the batch is committed
+                recorded_today.update(recorded)
+            return results
+        except sqlite3.Error as e:
+            logging.error(f"Error recording attendance batch: {e}")
+            return None
+
     # Record manual attendance for a student
     def db_record_manual_attendance(self, student_name, date):
         try:
-            check = self.db_execute('SELECT COUNT(*) FROM STUDENTS WHERE student_name = ? AND date = ?', (student_name, date), fetch=True)
-            if not check[0][0]:
-                self.db_execute('INSERT INTO STUDENTS (Student_name, Date) VALUES (?, ?)', (student_name, date))
+            with self.db_connect() as conn:
+                recorded = self.db_insert_attendance(conn.cursor(), student_name, date)
+            if recorded:
+                with DBmanagement.recorded_lock:
+                    if DBmanagement.recorded_date == date:
+                        DBmanagement.recorded_today.add(student_name)
                 return True
             else:
                 return False
         except sqlite3.Error as e:
             logging.error(f"Error recording attendance: {e}")
         
+    # Yield (id, name, date) attendance rows in id order after after_id, read from the cursor in chunks
+    def db_iter_attendance(self, student=None, date_from=None, date_to=None, after_id=0, limit=None, chunk_size=500):
+        conditions, params = ['a.id > ?'], [after_id]
+        if student:
+            conditions.append('a.student_id = (SELECT id FROM students WHERE name = ?)')
+            params.append(student)
+        if date_from:
+            conditions.append('a.date >= ?')
+            params.append(date_from)
+        if date_to:
+            conditions.append('a.date <= ?')
+            params.append(date_to)
+        query = f'''SELECT a.id, s.name, a.date FROM attendance a JOIN students s ON s.id = a.student_id
+                    WHERE {' AND '.join(conditions)} ORDER BY a.id'''
+        if limit:
+            query += ' LIMIT ?'
+            params.append(limit)
+        yield from self.db_iter_query(query, params, chunk_size)
+
+    # Yield the rows of a query without loading them all in memory
+    def db_iter_query(self, query, params, chunk_size):
+        cursor = self.db_connect().execute(query, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            cursor.close()
+
+    # Get the counter that changes whenever the students or their attendance change
+    def db_change_counter(self):
+        try:
+            rows = self.db_execute("SELECT value FROM meta WHERE key = 'attendance_changes'", fetch=True)
+            return rows[0][0] if rows else None
+        except sqlite3.Error as e:
+            logging.error(f"Error getting the change counter: {e}")
+            return None
+
     # Get attendance records from the database
     def db_get_attendance(self):
         try:
-            return self.db_execute('SELECT Student_name, Date FROM STUDENTS', fetch=True)
+            # One (name, None) roster row per student, followed by its attendance dates
+            return self.db_execute('''SELECT name, NULL FROM students
+                                      UNION ALL
+                                      SELECT s.name, a.date FROM attendance a JOIN students s ON s.id = a.student_id
+                                      ORDER BY 1, 2''', fetch=True)
         except sqlite3.Error as e:
             logging.error(f"Error getting attendance: {e}")
             return None
\ No newline at end of file
@@ -9,17 +9,15 @@ from PyQt6.QtWidgets import (
 import logging
 import os.path
 import re
-import cv2
-import numpy as np
 from datetime import datetime
-import pandas as pd
 import subprocess
-import psutil
 import shutil
-import face_recognition
 from DB_admin import DBAdmin
 from DB_management import DBmanagement
-from recognition import FaceRecognitionThread
+from reporting import ReportEngine
+from config import CAPTURE_SOURCES
+# cv2, psutil, OpenVINO and face_recognition are imported where they
+# are first used, so the login window opens without loading them
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
@@ -45,8 +43,6 @@ USERNAME_ICON_PATH = os.path.join(BASE_DIR, "icons", "username.png")
 PASSWORD_ICON_PATH = os.path.join(BASE_DIR, "icons", "password.png")
 DB_ADMIN_PATH = os.path.join(DATA_DIR, "admin.db")
 DB_STUDENT_PATH = os.path.join(DATA_DIR, "students.db")
-MODEL_PATH = os.path.join(BASE_DIR, "intel", "face-detection-adas-0001", "FP16", "face-detection-adas-0001.xml")
-MODEL_BIN = os.path.join(BASE_DIR, "intel", "face-detection-adas-0001", "FP16", "face-detection-adas-0001.bin")
 PHOTO_FILE_PATH = os.path.join(BASE_DIR, "imgs")
 
 """
@@ -232,6 +228,8 @@ class MainApp(MainLayoutCore):
             self.db_student.db_students_init()
             self.login_page(Qt.AlignmentFlag.AlignCenter)
             self.face_recognition_thread = None
+            self.display_timer = None
+            self.report_thread = None
             self.is_login_page = True  
             self.failed_login_attempts = 0
             global admin
@@ -313,6 +311,11 @@ class MainApp(MainLayoutCore):
             self.create_button(h_layout_web_server, "Check Complaints", self.check_complaints, Qt.AlignmentFlag.AlignCenter, "webServerButton", 50, 180)
             self.add_spacer(self.main_layout, 10)
             
+            h_layout_report = self.set_h_layout(self.main_layout, alignment, "hLayoutReport")
+            self.create_dropdown(h_layout_report, ["xlsx", "csv", "parquet"], width=120, height=50, alignment=Qt.AlignmentFlag.AlignCenter, object_name="dropdownMenuReport")
+            self.create_label(h_layout_report, "", Qt.AlignmentFlag.AlignCenter, "reportProgressLabel")
+            self.add_spacer(self.main_layout, 10)
+
             h_layout_logout = self.set_h_layout(self.main_layout, alignment, "hLayoutLogout")
             self.create_button(h_layout_logout, "Delete All", self.delete_all_data, Qt.AlignmentFlag.AlignCenter, "logoutButton", 50, 120)
             self.create_button(h_layout_logout, "Log Out", self.logout, Qt.AlignmentFlag.AlignCenter, "logoutButton", 50, 120)
@@ -419,19 +422,18 @@ class MainApp(MainLayoutCore):
     def add_student_name(self):
         try:
             global admin
-            txt_file = self.selection_window("Text Files (*.txt);;All Files (*)", "Select Names")
+            txt_file = self.selection_window("Rosters (*.txt *.csv);;All Files (*)", "Select Names")
             if txt_file:
                 if isinstance(txt_file, list):
                     txt_file = txt_file[0] 
-                with open(txt_file, 'r') as file:
-                    names = file.readlines()
-                    for name in names:
-                        name = name.strip()
-                        if not self.db_student.db_check_student(name):
-                            self.db_student.db_add_student(name)
-                    self.clear_layout(self.layout())
-                    self.admin_page(self.username, Qt.AlignmentFlag.AlignCenter)
-                    self.showPopUp('Names added\nsuccessfully', 'addPop')
+                result = self.db_student.db_import_students(txt_file)
+                if result is None:
+                    self.showPopUp('Could not import\nnames', 'addPop')
+                    return
+                inserted, skipped = result
+                self.clear_layout(self.layout())
+                self.admin_page(self.username, Qt.AlignmentFlag.AlignCenter)
+                self.showPopUp(f'{inserted} names added\n{skipped} skipped', 'addPop')
         except Exception as e:
             logging.error(f"Error: {e}")
             sys.exit(1)
@@ -508,45 +510,55 @@ class MainApp(MainLayoutCore):
 # Method to start the video feed for face recognition            
     def start_video_feed(self):
         try:
-            known_face_encodings = []
-            known_face_names = []
+            from encoding_cache import EncodingCache
+            from face_detector import resolve_model
+            from face_matcher import build_matcher
+            from recognition import FaceRecognitionThread, MultiCameraRecognitionThread
+            student_names = []
             students = self.db_student.db_get_students()
             for student in students:
-                if student[1] not in known_face_names:
-                    known_face_names.append(student[1])
-            print(known_face_names)
+                if student[1] not in student_names:
+                    student_names.append(student[1])
+            logging.debug(f"Students enrolled: {student_names}")
 
-            for name in known_face_names:
-                try:
-                    photo_path = f"{PHOTO_FILE_PATH}/{name}.jpg"
-                    self.showPopUp(f"Loading image\n for {name}", 'loadPop')
-                    photo_load = face_recognition.load_image_file(photo_path)
-                    photo_encodings = face_recognition.face_encodings(photo_load, model='small')
-                    if photo_encodings:
-                        known_face_encodings.append(photo_encodings[0])
-                    else:
-                        logging.error(f"No face encodings found for {name}")
-                except Exception as e:
-                    logging.error(f"Error processing {name}: {e}")
-            
-            self.face_recognition_thread = FaceRecognitionThread(known_face_encodings, known_face_names, MODEL_PATH, MODEL_BIN)
+            # Only new or changed photos are encoded; the rest come from the cache
+            encoding_cache = EncodingCache()
+            known_face_encodings, known_face_names = encoding_cache.load_encodings(
+                student_names, PHOTO_FILE_PATH,
+                on_encode=lambda name: self.showPopUp(f"Loading image\n for {name}", 'loadPop'))
+
+            # Build the identity index, or load it if the enrollment did not change
+            matcher = build_matcher(known_face_encodings, known_face_names)
+            # Load the configured model precision, or the fastest one on this machine
+            model_path, model_bin = resolve_model()
+            # Frames are scaled to the label by the recognition thread
+            display_size = (self.video_label.width(), self.video_label.height())
+            if len(CAPTURE_SOURCES) > 1:
+                self.face_recognition_thread = MultiCameraRecognitionThread(matcher, model_path, model_bin, CAPTURE_SOURCES, display_size)
+            else:
+                self.face_recognition_thread = FaceRecognitionThread(matcher, model_path, model_bin, CAPTURE_SOURCES[0], display_size)
             self.face_recognition_thread.attendance_signal.connect(self.show_attendance_popup)
-            self.face_recognition_thread.frame_signal.connect(self.update_video_frame)
             self.face_recognition_thread.start()
+
+            # Show the newest frame once per screen refresh
+            refresh_rate = self.screen().refreshRate() if self.screen() is not None else 0
+            self.display_timer = QTimer(self)
+            self.display_timer.setInterval(max(1, round(1000 / (refresh_rate or 60))))
+            self.display_timer.timeout.connect(self.update_video_frame)
+            self.display_timer.start()
         except Exception as e:
             logging.error(f"Error: {e}")
             sys.exit(1)
 
 # Method to update the video frame for face recognition
-    def update_video_frame(self, frame):
+    def update_video_frame(self):
         try:
-            # Convert the frame to QImage and display it
-            rgb_image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            h, w, ch = rgb_image.shape
-            bytes_per_line = ch * w
-            qt_image = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format.Format_RGB888)
-            if self.video_label is not None:
-                self.video_label.setPixmap(QPixmap.fromImage(qt_image))
+            if self.face_recognition_thread is None:
+                return
+            # Nothing to do until the recognition thread publishes a new frame
+            display = self.face_recognition_thread.display_slot.take()
+            if display is not None and self.video_label is not None:
+                self.video_label.setPixmap(QPixmap.fromImage(display.image))
         except Exception as e:
             logging.error(f"Error: {e}")
             sys.exit(1)
@@ -554,6 +566,9 @@ class MainApp(MainLayoutCore):
 # Method to stop the video feed for face recognition
     def stop_video_feed(self):
         try:
+            if self.display_timer is not None:
+                self.display_timer.stop()
+                self.display_timer = None
             if self.face_recognition_thread is not None:
                 self.face_recognition_thread.stop()
                 self.face_recognition_thread = None
@@ -585,6 +600,7 @@ class MainApp(MainLayoutCore):
 # Method to check if the server is running    
     def is_server_running(self, script_name):
         try:
+            import psutil
             for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
                 if script_name in proc.info['cmdline']:
                     return True
@@ -615,6 +631,8 @@ class MainApp(MainLayoutCore):
             os.system(f"rm -rf imgs/*")
             os.system(f"rm -rf data/students.db")
             os.system(f"rm -rf data/admin.db")
+            os.system(f"rm -rf data/encodings.db")
+            os.system(f"rm -rf data/face_index.npz")
             os.system(f"rm -rf reports/*")
             self.showPopUp('All data deleted \n  successfully', 'deletePop')
             sys.exit(1)
@@ -622,39 +640,48 @@ class MainApp(MainLayoutCore):
             logging.error(f"Error: {e}")
             sys.exit(1)
       
-# Method to generate a report in excel format        
+# Method to generate a report in the selected format on a background thread
     def report(self):
         try:
-            attendance_data = self.db_student.db_get_attendance()
-            dataFrame = pd.DataFrame(attendance_data, columns=['student_name', 'date'])
-            dataFrame['date'] = dataFrame['date'].fillna("")
-            groupData = dataFrame.groupby('student_name').agg({
-                'date': [lambda x: max(0, len(x) - 1), lambda x: list(x)]
-            }).reset_index()
-            groupData.columns = ['student_name', 'attendance_count', 'dates']
-            report_data = groupData.to_dict(orient='records')
-            for record in report_data:
-                record['dates'] = " ; ".join(record['dates'][1:])
-            report_df = pd.DataFrame(report_data)
-            report_path = os.path.join(REPORTS_DIR, 'attendance_report.xlsx')
-            report_df.to_excel(report_path, index=False)
-            self.showPopUp('Report generated \n  successfully', 'raportPop')
+            from report_export import ReportExportThread
+            if self.report_thread is not None and self.report_thread.isRunning():
+                self.showPopUp('Report is already\n being generated', 'raportPop')
+                return
+            export_format = self.findChild(QComboBox, "dropdownMenuReport").currentText()
+            report_path = os.path.join(REPORTS_DIR, f'attendance_report.{export_format}')
+            self.report_thread = ReportExportThread(report_path, export_format)
+            self.report_thread.progress_signal.connect(self.update_report_progress)
+            self.report_thread.finished_signal.connect(self.report_finished)
+            self.report_thread.failed_signal.connect(self.report_failed)
+            self.report_thread.start()
         except Exception as e:
             logging.error(f"Error: {e}")
             sys.exit(1)
+
+# Method to show the progress of the report export
+    def update_report_progress(self, written, total):
+        self.update_report_progress_text(f"{written} / {total} students")
+
+# Method to report a finished export
+    def report_finished(self, report_path):
+        self.update_report_progress_text("Report ready")
+        self.showPopUp('Report generated \n  successfully', 'raportPop')
+
+# Method to report a failed export
+    def report_failed(self, message):
+        self.update_report_progress_text(message)
+        self.showPopUp(message, 'raportPop')
+
+# Method to set the text of the report progress label
+    def update_report_progress_text(self, text):
+        progress_label = self.findChild(QLabel, "reportProgressLabel")
+        if progress_label is not None:
+            progress_label.setText(text)
  
 # Method to show the student names from the database        
     def show_student_db(self):
         try:
-            attendance_data = self.db_student.db_get_attendance()
-            dataFrame = pd.DataFrame(attendance_data, columns=['student_name', 'date'])
-            dataFrame['date'] = dataFrame['date'].fillna("")
-            groupData = dataFrame.groupby('student_name').agg({
-                'date': [lambda x: max(0, len(x) - 1), lambda x: list(x)]
-            }).reset_index()
-            groupData.columns = ['student_name', 'attendance_count', 'dates']
-            student_names = groupData['student_name'].tolist()
-            return student_names
+            return ReportEngine(self.db_student).student_names()
         except Exception as e:
             logging.error(f"Error: {e}")
             sys.exit(1)   
@@ -0,0 +1,89 @@
+import logging
+import queue
+import threading
+import time
+from DB_management import DBmanagement
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+"""
+    This class records attendance in the background. Recognized students
+    are put on a queue and a writer thread drains it, grouping the events
+    into one transaction per batch or time window, so disk I/O never
+    blocks frame processing. Stopping the writer flushes pending events.
+"""
+class AttendanceWriter(threading.Thread):
+    def __init__(self, on_result=None, batch_size=32, flush_interval=0.5):
+        super().__init__(name="attendance-writer", daemon=True)
+        self.on_result = on_result
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.events = queue.Queue()
+        self.stop_event = threading.Event()
+        self.db = DBmanagement()
+        self.db.db_warm_attendance_cache()
+
+    # Queue a recognized student for attendance
+    def submit(self, name, distance=None):
+        self.events.put((name, distance))
+
+    # Collect the next batch, waiting at most flush_interval after its first event
+    def next_batch(self):
+        try:
+            batch = [self.events.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self.stop_event.is_set():
+                break
+            try:
+                batch.append(self.events.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    # Write a batch in one transaction and report the outcome of each event
+    def write_batch(self, batch):
+        results = self.db.db_record_attendance_batch([name for name, _ in batch])
+        if results is None:
+            logging.error(f"Could not record attendance for {len(batch)} events")
+            return
+        for (name, distance), recorded in zip(batch, results):
+            if recorded:
+                logging.info(f"Attendance recorded for {name}" + (f" (distance {distance:.3f})" if distance is not None else ""))
+            else:
+                logging.info(f"Attendance already recorded for {name} today")
+            if self.on_result is not None:
+                self.on_result(name, recorded)
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                batch = self.next_batch()
+                if batch:
+                    self.write_batch(batch)
+        except Exception as e:
+            logging.error(f"An error occurred in the attendance writer: {e}")
+        finally:
+            self.flush()
+            self.db.db_close()
+
+    # Write every event still queued
+    def flush(self):
+        batch = []
+        while True:
+            try:
+                batch.append(self.events.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self.write_batch(batch)
+            logging.info(f"Flushed {len(batch)} pending attendance events")
+
+    def stop(self):
+        self.stop_event.set()
+        if self.is_alive():
+            self.join()
@@ -0,0 +1,156 @@
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+import cv2
+from DB_management import DBmanagement
+from encoding_cache import EncodingCache
+from face_detector import FaceDetector, encode_faces, resolve_model
+from face_matcher import build_matcher
+from tracker import FaceTracker
+from config import MODEL_PRECISION
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+# Define constants for file paths and other configurations
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PHOTO_FILE_PATH = os.path.join(BASE_DIR, "imgs")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+# Yield (frame_index, position, frame) for a video file or a directory of images
+def read_frames(source, every):
+    if os.path.isdir(source):
+        paths = sorted(path for path in glob.glob(os.path.join(source, "*")) if path.lower().endswith(IMAGE_EXTENSIONS))
+        for frame_index, path in enumerate(paths[::every]):
+            frame = cv2.imread(path)
+            if frame is None:
+                logging.warning(f"Could not read image {path}")
+                continue
+            yield frame_index, os.path.basename(path), frame
+        return
+
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video {source}")
+    try:
+        frame_index = 0
+        while True:
+            # grab() skips decoding of the frames that are not processed
+            if not cap.grab():
+                break
+            if frame_index % every == 0:
+                ret, frame = cap.retrieve()
+                if ret:
+                    yield frame_index, round(cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0, 3), frame
+            frame_index += 1
+    finally:
+        cap.release()
+
+"""
+    This class runs the recognition pipeline without Qt over a video
+    file or a directory of images, as fast as the CPU allows, and emits
+    one attendance event per recognized person.
+"""
+class BatchRecognizer:
+    def __init__(self, matcher, detector, track_faces):
+        self.matcher = matcher
+        self.detector = detector
+        # Frames of a video are consecutive, images of a directory are not
+        self.tracker = FaceTracker() if track_faces else None
+        self.frames = 0
+        self.faces = 0
+        self.encoded = 0
+
+    # Detect, encode and match the faces of a frame and return the new recognitions
+    def process(self, frame):
+        boxes = self.detector.detect(frame)
+        self.frames += 1
+        self.faces += len(boxes)
+        if self.tracker is not None:
+            tracks = self.tracker.update(boxes)
+            pending_tracks = [track for track in tracks if self.tracker.needs_encoding(track)]
+            pending_boxes = [track.box for track in pending_tracks]
+        else:
+            pending_tracks = [None] * len(boxes)
+            pending_boxes = boxes
+        if len(pending_boxes) == 0:
+            return []
+
+        face_encodings = encode_faces(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), pending_boxes)
+        self.encoded += len(face_encodings)
+        recognized = []
+        for track, box, (name, distance) in zip(pending_tracks, pending_boxes, self.matcher.match(face_encodings)):
+            if track is not None:
+                if self.tracker.resolve(track, name, distance):
+                    recognized.append((name, distance, box, track.track_id))
+            elif name != "Unknown":
+                recognized.append((name, distance, box, None))
+        return recognized
+
+# Load the known students and build the matcher
+def load_matcher(photo_dir):
+    students = DBmanagement().db_get_students() or []
+    student_names = list(dict.fromkeys(student[1] for student in students))
+    known_face_encodings, known_face_names = EncodingCache().load_encodings(student_names, photo_dir)
+    return build_matcher(known_face_encodings, known_face_names)
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless face recognition over a video file or a directory of images")
+    parser.add_argument("source", help="Video file or directory of images")
+    parser.add_argument("--output", help="Write the attendance events as JSON lines to this file (default: stdout)")
+    parser.add_argument("--db", action="store_true", help="Also record the attendance in data/students.db")
+    parser.add_argument("--date", help="Attendance date for --db as YYYY-MM-DD (default: today)")
+    parser.add_argument("--every", type=int, default=1, help="Process every Nth frame or image")
+    parser.add_argument("--photos", default=PHOTO_FILE_PATH, help="Directory with the student photos")
+    parser.add_argument("--model", help="OpenVINO model .xml (default: the configured precision variant)")
+    parser.add_argument("--weights", help="OpenVINO model .bin (default: next to --model)")
+    args = parser.parse_args()
+    if args.date:
+        try:
+            datetime.strptime(args.date, "%Y-%m-%d")
+        except ValueError:
+            parser.error("--date must be formatted as YYYY-MM-DD")
+
+    db = DBmanagement()
+    db.db_students_init()
+    matcher = load_matcher(args.photos)
+    if args.model:
+        model_path, model_bin = args.model, args.weights or os.path.splitext(args.model)[0] + ".bin"
+    else:
+        model_path, model_bin = resolve_model(MODEL_PRECISION)
+    detector = FaceDetector(model_path, model_bin, performance_hint="LATENCY")
+    recognizer = BatchRecognizer(matcher, detector, track_faces=not os.path.isdir(args.source))
+
+    output = open(args.output, "w") if args.output else sys.stdout
+    present = set()
+    begin = time.perf_counter()
+    try:
+        for frame_index, position, frame in read_frames(args.source, max(1, args.every)):
+            for name, distance, box, track_id in recognizer.process(frame):
+                present.add(name)
+                event = {"source": args.source, "frame": frame_index, "position": position, "name": name,
+                         "distance": round(distance, 4), "box": [int(value) for value in box], "track": track_id}
+                output.write(json.dumps(event) + "\n")
+    except KeyboardInterrupt:
+        logging.info("Interrupted, reporting partial results")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    elapsed = time.perf_counter() - begin
+
+    if args.db and present:
+        results = db.db_record_attendance_batch(sorted(present), args.date)
+        if results is not None:
+            logging.info(f"Recorded attendance for {sum(results)} students ({len(present) - sum(results)} already recorded)")
+
+    fps = recognizer.frames / elapsed if elapsed > 0 else 0.0
+    logging.info(f"Processed {recognizer.frames} frames in {elapsed:.2f}s ({fps:.1f} FPS), "
+                 f"{recognizer.faces} faces detected, {recognizer.encoded} encoded, {len(present)} students recognized")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+import argparse
+import glob
+import json
+import importlib.util
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from face_index import ExactIndex, IVFIndex
+from config import MODEL_PATH, MODEL_BIN
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PHOTO_FILE_PATH = os.path.join(BASE_DIR, "imgs")
+
+# Generate synthetic 128-d identities and noisy probe encodings of some of them
+def synthetic_embeddings(identities, queries, seed=0):
+    rng = np.random.default_rng(seed)
+    # Scaled so that different identities are ~0.9 apart and probes ~0.35 from
+    # their identity, similar to dlib face descriptors
+    known = rng.normal(0.0, 0.056, size=(identities, 128)).astype(np.float32)
+    truth = rng.integers(0, identities, size=queries)
+    probes = known[truth] + rng.normal(0.0, 0.031, size=(queries, 128)).astype(np.float32)
+    return known, probes, truth
+
+# Return the p50/p95/p99 of a list of durations in milliseconds
+def percentiles(samples_ms):
+    p50, p95, p99 = np.percentile(samples_ms, [50, 95, 99])
+    return {"p50_ms": round(float(p50), 4), "p95_ms": round(float(p95), 4), "p99_ms": round(float(p99), 4)}
+
+# Time the search of every frame-sized batch of probes
+def time_search(index, probes, faces_per_frame):
+    timings = []
+    found = []
+    for start in range(0, len(probes), faces_per_frame):
+        batch = probes[start:start + faces_per_frame]
+        begin = time.perf_counter()
+        best, _ = index.search(batch)
+        timings.append((time.perf_counter() - begin) * 1000)
+        found.append(best)
+    return np.concatenate(found), timings
+
+# Benchmark recall against latency for the exact and ivf identity indexes
+def bench_index(args):
+    results = []
+    for identities in args.identities:
+        known, probes, _ = synthetic_embeddings(identities, args.queries, args.seed)
+        begin = time.perf_counter()
+        exact = ExactIndex(known)
+        build_ms = (time.perf_counter() - begin) * 1000
+        truth, timings = time_search(exact, probes, args.faces_per_frame)
+        results.append({"identities": identities, "backend": "exact", "nprobe": None,
+                        "build_ms": round(build_ms, 2), "recall_at_1": 1.0, **percentiles(timings)})
+
+        begin = time.perf_counter()
+        ivf = IVFIndex(known, seed=args.seed)
+        build_ms = (time.perf_counter() - begin) * 1000
+        for nprobe in args.nprobe:
+            ivf.nprobe = nprobe
+            found, timings = time_search(ivf, probes, args.faces_per_frame)
+            results.append({"identities": identities, "backend": "ivf", "nprobe": nprobe,
+                            "build_ms": round(build_ms, 2), "recall_at_1": round(float(np.mean(found == truth)), 4),
+                            **percentiles(timings)})
+
+    print(f"{'identities':>10} {'backend':>8} {'nprobe':>6} {'build ms':>10} {'recall@1':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for row in results:
+        print(f"{row['identities']:>10} {row['backend']:>8} {str(row['nprobe'] or '-'):>6} {row['build_ms']:>10} "
+              f"{row['recall_at_1']:>9} {row['p50_ms']:>8} {row['p95_ms']:>8} {row['p99_ms']:>8}")
+    return results
+
+# Load sample frames with their face boxes, or synthetic frames with fixed boxes
+def sample_frames(images_dir, synthetic_frames, faces, seed=0):
+    import cv2
+    import face_recognition
+    frames = []
+    for path in sorted(glob.glob(os.path.join(images_dir, "*.jpg")))[:synthetic_frames]:
+        frame = cv2.imread(path)
+        if frame is None:
+            continue
+        # HOG boxes stand in for the OpenVINO detections
+        locations = face_recognition.face_locations(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        boxes = [(left, top, right, bottom) for top, right, bottom, left in locations]
+        if boxes:
+            frames.append((frame, boxes))
+    if frames:
+        logging.info(f"Using {len(frames)} sample images from {images_dir}")
+        return frames
+    logging.info(f"No sample images with faces in {images_dir}, using synthetic frames")
+    rng = np.random.default_rng(seed)
+    for _ in range(synthetic_frames):
+        frame = rng.integers(0, 256, size=(480, 640, 3), dtype=np.uint8)
+        boxes = [(40 + 150 * i, 120, 160 + 150 * i, 240) for i in range(faces)]
+        frames.append((frame, boxes))
+    return frames
+
+# Compare per-ROI encoding (dlib re-detects in every crop) with encoding at the known boxes
+def bench_encoding(args):
+    import cv2
+    import face_recognition
+    from face_detector import encode_faces
+    frames = sample_frames(args.images, args.frames, args.faces, args.seed)
+
+    before = []
+    after = []
+    for _ in range(args.repeat):
+        for frame, boxes in frames:
+            begin = time.perf_counter()
+            for xmin, ymin, xmax, ymax in boxes:
+                face_roi = frame[ymin:ymax, xmin:xmax]
+                face_recognition.face_encodings(cv2.cvtColor(face_roi, cv2.COLOR_BGR2RGB))
+            before.append((time.perf_counter() - begin) * 1000)
+
+            begin = time.perf_counter()
+            encode_faces(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), boxes)
+            after.append((time.perf_counter() - begin) * 1000)
+
+    results = [{"method": "per_roi_redetect", **percentiles(before)},
+               {"method": "known_face_locations", **percentiles(after)}]
+    print(f"{'method':>22} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for row in results:
+        print(f"{row['method']:>22} {row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9}")
+    print(f"Per-frame speedup (p50): {results[0]['p50_ms'] / max(results[1]['p50_ms'], 1e-9):.2f}x")
+    return results
+
+# Place face crops (or noise) at a grid of boxes on a synthetic 640x480 frame
+def synthetic_frame(rng, faces, crops):
+    import cv2
+    frame = rng.integers(0, 256, size=(480, 640, 3), dtype=np.uint8)
+    boxes = []
+    for i in range(faces):
+        xmin, ymin = 20 + 155 * (i % 4), 60 + 200 * (i // 4 % 2)
+        boxes.append((xmin, ymin, xmin + 110, ymin + 110))
+        if crops:
+            frame[ymin:ymin + 110, xmin:xmin + 110] = cv2.resize(crops[i % len(crops)], (110, 110))
+    return frame, boxes
+
+# Time every stage of the recognition pipeline for each face count and enrollment size
+def bench_pipeline(args):
+    import cv2
+    import DB_management
+    from DB_management import DBmanagement
+    from face_detector import FaceDetector, encode_faces
+    from face_matcher import FaceMatcher
+
+    detector = None
+    if not args.skip_inference:
+        if not (os.path.exists(args.model) and os.path.exists(args.weights)):
+            raise SystemExit(f"Model files not found: {args.model} / {args.weights} (use --skip-inference)")
+        detector = FaceDetector(args.model, args.weights, device="CPU")
+
+    crops = [frame[ymin:ymax, xmin:xmax] for frame, boxes in sample_frames(args.images, 8, 0, args.seed)
+             for xmin, ymin, xmax, ymax in boxes] if os.path.isdir(args.images) else []
+    rng = np.random.default_rng(args.seed)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for enrollment in args.enrollment:
+            known, _, _ = synthetic_embeddings(enrollment, 1, args.seed)
+            names = [f"student_{i:06d}" for i in range(enrollment)]
+            matcher = FaceMatcher(known, names)
+
+            # Every enrollment size gets a fresh attendance database
+            DB_management.DB_STUDENT_PATH = os.path.join(tmp_dir, f"students_{enrollment}.db")
+            DBmanagement.recorded_date = None
+            db = DBmanagement()
+            db.db_students_init()
+            db.db_add_students(names)
+
+            for faces in args.faces:
+                timings = {stage: [] for stage in ("preprocess", "inference", "postprocess", "encoding", "matching", "attendance", "total")}
+                for _ in range(args.frames):
+                    frame, boxes = synthetic_frame(rng, faces, crops)
+                    frame_begin = time.perf_counter()
+                    if detector is not None:
+                        begin = time.perf_counter()
+                        detector.preprocess(frame)
+                        timings["preprocess"].append((time.perf_counter() - begin) * 1000)
+                        begin = time.perf_counter()
+                        detections = detector.infer()
+                        timings["inference"].append((time.perf_counter() - begin) * 1000)
+                        begin = time.perf_counter()
+                        detector.postprocess(detections, frame.shape)
+                        timings["postprocess"].append((time.perf_counter() - begin) * 1000)
+
+                    # The synthetic boxes stand in for the detections downstream
+                    begin = time.perf_counter()
+                    face_encodings = encode_faces(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), boxes) if boxes else []
+                    timings["encoding"].append((time.perf_counter() - begin) * 1000)
+                    begin = time.perf_counter()
+                    matcher.match(face_encodings)
+                    timings["matching"].append((time.perf_counter() - begin) * 1000)
+                    begin = time.perf_counter()
+                    for index in rng.integers(0, enrollment, size=len(boxes)):
+                        db.db_record_attendance(names[index])
+                    timings["attendance"].append((time.perf_counter() - begin) * 1000)
+                    timings["total"].append((time.perf_counter() - frame_begin) * 1000)
+
+                for stage, samples in timings.items():
+                    if samples:
+                        results.append({"faces": faces, "enrollment": enrollment, "stage": stage, **percentiles(samples)})
+                fps = 1000.0 / float(np.mean(timings["total"]))
+                results.append({"faces": faces, "enrollment": enrollment, "stage": "end_to_end_fps", "fps": round(fps, 2)})
+            db.db_close()
+
+    print(f"{'faces':>5} {'enroll':>7} {'stage':>14} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for row in results:
+        if "fps" in row:
+            print(f"{row['faces']:>5} {row['enrollment']:>7} {'FPS':>14} {row['fps']:>9}")
+        else:
+            print(f"{row['faces']:>5} {row['enrollment']:>7} {row['stage']:>14} {row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9}")
+    return results
+
+# The pandas aggregation the reports used before the SQL report engine
+def pandas_report(db):
+    import pandas as pd
+    dataFrame = pd.DataFrame(db.db_get_attendance(), columns=['student_name', 'date'])
+    dataFrame['date'] = dataFrame['date'].fillna("")
+    groupData = dataFrame.groupby('student_name').agg({
+        'date': [lambda x: max(0, len(x) - 1), lambda x: list(x)]
+    }).reset_index()
+    groupData.columns = ['student_name', 'attendance_count', 'dates']
+    report_data = groupData.to_dict(orient='records')
+    for record in report_data:
+        record['dates'] = " ; ".join(record['dates'][1:])
+    return report_data
+
+# Compare the pandas report with the SQL aggregate and the summary table on a synthetic history
+def bench_report(args):
+    import DB_management
+    from DB_management import DBmanagement
+    from reporting import ReportEngine
+
+    days = max(1, args.rows // args.students)
+    dates = [time.strftime("%Y-%m-%d", time.gmtime(1577836800 + 86400 * day)) for day in range(days)]
+    methods = {"sql_aggregate": lambda db: ReportEngine(db).report_rows(use_summary=False),
+               "summary_table": lambda db: ReportEngine(db).report_rows()}
+    if importlib.util.find_spec("pandas") is not None:
+        methods = {"pandas": pandas_report, **methods}
+    else:
+        logging.warning("pandas is not installed, skipping the pandas baseline")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        DB_management.DB_STUDENT_PATH = os.path.join(tmp_dir, "students.db")
+        DBmanagement.recorded_date = None
+        db = DBmanagement()
+        db.db_students_init()
+        names = [f"student_{i:06d}" for i in range(args.students)]
+        db.db_add_students(names)
+        begin = time.perf_counter()
+        # Day by day, like the attendance is recorded, so the summary triggers append
+        with db.db_connect() as conn:
+            conn.executemany('INSERT INTO attendance (student_id, date) SELECT id, ? FROM students WHERE name = ?',
+                             ((date, name) for date in dates for name in names))
+        load_s = time.perf_counter() - begin
+        logging.info(f"Loaded {days * args.students} attendance rows in {load_s:.1f}s")
+
+        results = []
+        reports = {}
+        for method, build in methods.items():
+            timings = []
+            for _ in range(args.repeat):
+                begin = time.perf_counter()
+                reports[method] = build(db)
+                timings.append((time.perf_counter() - begin) * 1000)
+            results.append({"method": method, "rows": days * args.students, "students": args.students, **percentiles(timings)})
+        db.db_close()
+
+    # Every method has to produce the same counts and dates
+    expected = [(row[0], row[1], row[3]) for row in reports["summary_table"]]
+    for method, report in reports.items():
+        rows = [(row["student_name"], row["attendance_count"], row["dates"]) if isinstance(row, dict) else (row[0], row[1], row[3])
+                for row in report]
+        if rows != expected:
+            logging.error(f"The {method} report differs from the summary table")
+
+    baseline = results[0]["p50_ms"]
+    print(f"{'method':>14} {'p50 ms':>10} {'p95 ms':>10} {'speedup':>8}")
+    for row in results:
+        row["speedup"] = round(baseline / max(row["p50_ms"], 1e-9), 2)
+        print(f"{row['method']:>14} {row['p50_ms']:>10} {row['p95_ms']:>10} {row['speedup']:>7}x")
+    return results
+
+# Sum the self time of the modules reported by -X importtime per top-level package, in microseconds
+def parse_importtime(stderr):
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        package = fields[2].strip().split(".")[0]
+        self_us, modules = packages.get(package, (0, 0))
+        packages[package] = (self_us + int(fields[0]), modules + 1)
+    return packages
+
+# Measure the import cost of a module per top-level package in fresh interpreters
+def bench_startup(args):
+    wall_ms = []
+    runs = []
+    for _ in range(args.repeat):
+        begin = time.perf_counter()
+        completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {args.module}"],
+                                   cwd=BASE_DIR, capture_output=True, text=True)
+        wall_ms.append((time.perf_counter() - begin) * 1000)
+        if completed.returncode != 0:
+            raise SystemExit(f"Importing {args.module} failed:\n{completed.stderr[-2000:]}")
+        runs.append(parse_importtime(completed.stderr))
+
+    packages = []
+    for package in set().union(*runs):
+        samples = [run.get(package, (0, 0))[0] / 1000.0 for run in runs]
+        packages.append({"package": package, "self_ms": round(float(np.median(samples)), 2),
+                         "modules": max(run.get(package, (0, 0))[1] for run in runs)})
+    packages.sort(key=lambda row: row["self_ms"], reverse=True)
+    results = {"module": args.module, "wall_ms": round(float(np.median(wall_ms)), 2),
+               "import_ms": round(sum(row["self_ms"] for row in packages), 2), "packages": packages}
+
+    print(f"import {args.module}: {results['import_ms']} ms of imports, {results['wall_ms']} ms including interpreter start (median of {args.repeat})")
+    print(f"{'package':>24} {'self ms':>9} {'modules':>8}")
+    for row in packages[:args.top]:
+        print(f"{row['package']:>24} {row['self_ms']:>9} {row['modules']:>8}")
+    return results
+
+# Describe the machine and code version the results were measured on
+def metadata():
+    info = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "platform": platform.platform(),
+            "processor": platform.processor(), "cpu_count": os.cpu_count(),
+            "python": platform.python_version(), "numpy": np.__version__}
+    try:
+        info["commit"] = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=BASE_DIR, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        info["commit"] = None
+    for module in ("cv2", "openvino", "dlib"):
+        try:
+            info[module] = __import__(module).__version__
+        except (ImportError, AttributeError):
+            info[module] = None
+    return info
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the attendance recognition pipeline")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    index_parser = subparsers.add_parser("index", help="Recall versus latency of the identity indexes on synthetic 128-d embeddings")
+    index_parser.add_argument("--identities", type=int, nargs="+", default=[1000, 10000, 50000])
+    index_parser.add_argument("--queries", type=int, default=1000)
+    index_parser.add_argument("--faces-per-frame", type=int, default=4)
+    index_parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    index_parser.add_argument("--seed", type=int, default=0)
+    index_parser.set_defaults(func=bench_index)
+
+    encoding_parser = subparsers.add_parser("encoding", help="Per-frame encoding time before/after reusing the detector boxes")
+    encoding_parser.add_argument("--images", default=PHOTO_FILE_PATH, help="Directory with sample .jpg images")
+    encoding_parser.add_argument("--frames", type=int, default=20, help="Number of frames to use")
+    encoding_parser.add_argument("--faces", type=int, default=2, help="Faces per synthetic frame")
+    encoding_parser.add_argument("--repeat", type=int, default=3)
+    encoding_parser.add_argument("--seed", type=int, default=0)
+    encoding_parser.set_defaults(func=bench_encoding)
+
+    pipeline_parser = subparsers.add_parser("pipeline", help="p50/p95/p99 per pipeline stage and end-to-end FPS on CPU")
+    pipeline_parser.add_argument("--faces", type=int, nargs="+", default=[0, 1, 2, 4, 8])
+    pipeline_parser.add_argument("--enrollment", type=int, nargs="+", default=[100, 1000, 10000])
+    pipeline_parser.add_argument("--frames", type=int, default=50, help="Frames per configuration")
+    pipeline_parser.add_argument("--images", default=PHOTO_FILE_PATH, help="Directory with sample .jpg images to paste as faces")
+    pipeline_parser.add_argument("--model", default=MODEL_PATH)
+    pipeline_parser.add_argument("--weights", default=MODEL_BIN)
+    pipeline_parser.add_argument("--skip-inference", action="store_true", help="Skip the OpenVINO stages")
+    pipeline_parser.add_argument("--seed", type=int, default=0)
+    pipeline_parser.set_defaults(func=bench_pipeline)
+
+    report_parser = subparsers.add_parser("report", help="pandas versus SQL report aggregation on a synthetic attendance history")
+    report_parser.add_argument("--rows", type=int, default=1000000, help="Attendance rows to generate")
+    report_parser.add_argument("--students", type=int, default=1000)
+    report_parser.add_argument("--repeat", type=int, default=3)
+    report_parser.set_defaults(func=bench_report)
+
+    startup_parser = subparsers.add_parser("startup", help="Import cost per package of a module in a fresh interpreter (python -X importtime)")
+    startup_parser.add_argument("--module", default="UI", help="Module to import, e.g. UI or recognition")
+    startup_parser.add_argument("--repeat", type=int, default=5)
+    startup_parser.add_argument("--top", type=int, default=20, help="Number of packages to print")
+    startup_parser.set_defaults(func=bench_startup)
+
+    args = parser.parse_args()
+    results = args.func(args)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"command": args.command, "metadata": metadata(), "arguments": {key: value for key, value in vars(args).items() if key not in ("func", "output")},
+                       "results": results}, file, indent=2, sort_keys=True)
+        logging.info(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
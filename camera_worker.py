@@ -0,0 +1,123 @@
+import cv2
+import logging
+import queue
+import time
+from face_detector import FaceDetector, display_frame, draw_tracks, encode_faces
+from tracker import FaceTracker
+from frame_scheduler import FrameScheduler
+from motion import MotionGate
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+# Convert a configured capture source to what cv2.VideoCapture expects
+def parse_capture_source(source):
+    source = str(source).strip()
+    return int(source) if source.isdigit() else source
+
+# Put an item on a multiprocessing queue, discarding the oldest item if it is full
+def put_latest(target_queue, item):
+    while True:
+        try:
+            target_queue.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                target_queue.get_nowait()
+            except queue.Empty:
+                pass
+
+# Store the identities resolved by the main process on the worker's tracks
+def apply_identities(tracker, identity_queue):
+    tracks = None
+    while True:
+        try:
+            resolved = identity_queue.get_nowait()
+        except queue.Empty:
+            return
+        if tracks is None:
+            tracks = {track.track_id: track for track in tracker.tracks}
+        for track_id, name, distance in resolved:
+            track = tracks.get(track_id)
+            if track is not None:
+                tracker.resolve(track, name, distance)
+
+"""
+    Entry point of a camera worker process. Each worker owns one capture
+    source and its own compiled OpenVINO model. It detects, tracks and
+    encodes faces, sends the encodings of new or uncertain tracks to the
+    main process for matching, and receives the resolved identities back.
+    The worker for the primary source also sends annotated frames for
+    display.
+"""
+def run_camera_worker(source_id, source, model_path, model_bin, encodings_queue, identity_queue,
+                      display_queue, stop_event, scheduler_settings=(), motion_settings=(),
+                      display_size=(380, 480)):
+    cap = None
+    started_at = time.perf_counter()
+    first_frame_logged = False
+    try:
+        cap = cv2.VideoCapture(parse_capture_source(source))
+        if not cap.isOpened():
+            logging.error(f"Error: Could not open capture source {source}.")
+            return
+        # The worker detects one frame at a time
+        detector = FaceDetector(model_path, model_bin, performance_hint="LATENCY")
+        detector.warm_up()
+        tracker = FaceTracker()
+        scheduler = FrameScheduler(*scheduler_settings)
+        motion_gate = MotionGate(*motion_settings)
+        boxes = []
+        logging.info(f"Camera worker {source_id} started on source {source}")
+        while not stop_event.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                logging.warning(f"Error: Could not read frame from source {source}.")
+                break
+
+            motion_gate.update(frame)
+
+            # Let the scheduler skip frames the worker has no budget for
+            captured_at = time.perf_counter()
+            if not scheduler.should_process(captured_at):
+                continue
+
+            apply_identities(tracker, identity_queue)
+            # A static scene keeps the boxes of the last detection
+            detect = motion_gate.should_detect(captured_at)
+            if detect:
+                boxes = detector.detect(frame)
+            tracks = tracker.update(boxes)
+            detected_at = time.perf_counter()
+            if detect:
+                scheduler.record_stage("detection", (detected_at - captured_at) * 1000)
+            pending_tracks = [track for track in tracks if tracker.needs_encoding(track)]
+            face_encodings = []
+            encode_ms = 0.0
+            if pending_tracks:
+                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                face_encodings = encode_faces(rgb_frame, [track.box for track in pending_tracks])
+                encode_ms = (time.perf_counter() - detected_at) * 1000
+                for track in pending_tracks:
+                    track.pending = True
+                # The live track ids let the main process forget the tracks this worker dropped
+                encodings_queue.put((source_id, [(track.track_id, encoding.astype("float32"))
+                                                 for track, encoding in zip(pending_tracks, face_encodings)],
+                                     [track.track_id for track in tracker.tracks]))
+
+            if display_queue is not None:
+                draw_tracks(frame, tracks)
+                # Only the small display image crosses the process boundary
+                put_latest(display_queue, display_frame(frame, display_size))
+            now = time.perf_counter()
+            if not first_frame_logged:
+                first_frame_logged = True
+                logging.info(f"Camera worker {source_id} recognized its first frame after {now - started_at:.2f}s")
+            scheduler.record_recognition((now - detected_at) * 1000, len(tracks), len(face_encodings), encode_ms,
+                                         (now - captured_at) * 1000)
+    except Exception as e:
+        logging.error(f"An error occurred in camera worker {source_id}: {e}")
+    finally:
+        if cap is not None:
+            cap.release()
+        logging.info(f"Camera worker {source_id} stopped")
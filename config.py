@@ -0,0 +1,50 @@
+import os
+
+# Every setting can be overridden with an environment variable of the same name
+# prefixed with ATTENDANCE_, e.g. ATTENDANCE_FACE_INDEX_BACKEND=ivf
+
+# Define constants for file paths and other configurations
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+
+# OpenVINO face detection model
+MODEL_DIR = os.path.join(BASE_DIR, "intel", "face-detection-adas-0001")
+MODEL_PATH = os.path.join(MODEL_DIR, "FP16", "face-detection-adas-0001.xml")
+MODEL_BIN = os.path.join(MODEL_DIR, "FP16", "face-detection-adas-0001.bin")
+# Precision variants shipped under MODEL_DIR, fastest first on most CPUs
+MODEL_PRECISIONS = ("FP16-INT8", "FP16", "FP32")
+# Precision to load, or "auto" to benchmark the available variants at startup
+MODEL_PRECISION = os.environ.get("ATTENDANCE_MODEL_PRECISION", "auto")
+MODEL_VARIANT_PATH = os.path.join(DATA_DIR, "model_variant.json")
+# OpenVINO device ("AUTO", "CPU", "GPU", "MULTI:GPU,CPU", ...) and performance hint
+# ("LATENCY" or "THROUGHPUT")
+OPENVINO_DEVICE = os.environ.get("ATTENDANCE_OPENVINO_DEVICE", "AUTO")
+OPENVINO_PERFORMANCE_HINT = os.environ.get("ATTENDANCE_OPENVINO_PERFORMANCE_HINT", "THROUGHPUT")
+# Infer requests kept in flight by the detection stage (0 = what the device reports as optimal)
+OPENVINO_INFER_REQUESTS = int(os.environ.get("ATTENDANCE_OPENVINO_INFER_REQUESTS", "0"))
+# Compiled models are cached below this directory per model hash and device (empty = no cache)
+OPENVINO_CACHE_DIR = os.environ.get("ATTENDANCE_OPENVINO_CACHE_DIR", os.path.join(DATA_DIR, "ov_cache"))
+
+# Identity index used by the face matcher: "exact", "ivf" or "auto"
+# ("auto" switches to ivf for large enrollments)
+FACE_INDEX_BACKEND = os.environ.get("ATTENDANCE_FACE_INDEX_BACKEND", "auto")
+# Number of inverted lists scanned per query by the ivf index
+FACE_INDEX_NPROBE = int(os.environ.get("ATTENDANCE_FACE_INDEX_NPROBE", "16"))
+FACE_INDEX_PATH = os.path.join(DATA_DIR, "face_index.npz")
+
+# Adaptive frame scheduling: end-to-end latency target, share of the time the busiest
+# stage may be kept busy, and an upper bound on processed frames per second (0 = none)
+TARGET_LATENCY_MS = float(os.environ.get("ATTENDANCE_TARGET_LATENCY_MS", "250"))
+PROCESSING_UTILIZATION = float(os.environ.get("ATTENDANCE_PROCESSING_UTILIZATION", "0.8"))
+MAX_PROCESS_FPS = float(os.environ.get("ATTENDANCE_MAX_PROCESS_FPS", "15"))
+
+# Motion gate in front of the detector: fraction of the downscaled frame that must change
+# (0 disables the gate), per-pixel grayscale change that counts, and the longest time
+# detections are reused on a static scene
+MOTION_SENSITIVITY = float(os.environ.get("ATTENDANCE_MOTION_SENSITIVITY", "0.005"))
+MOTION_PIXEL_DELTA = int(os.environ.get("ATTENDANCE_MOTION_PIXEL_DELTA", "25"))
+MOTION_REFRESH_SECONDS = float(os.environ.get("ATTENDANCE_MOTION_REFRESH_SECONDS", "5"))
+
+# Comma-separated capture sources (webcam indexes, video files or stream URLs);
+# more than one source runs each camera in its own worker process
+CAPTURE_SOURCES = [source.strip() for source in os.environ.get("ATTENDANCE_CAPTURE_SOURCES", "0").split(",") if source.strip()]
@@ -0,0 +1,45 @@
+import logging
+import os
+import sqlite3
+import threading
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+# Pragmas applied to every new connection
+# WAL lets readers run while the attendance writer commits, NORMAL sync is safe with WAL,
+# and the page cache is 16 MB per connection
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA foreign_keys=ON",
+)
+# Prepared statements kept per connection
+STATEMENT_CACHE_SIZE = 256
+BUSY_TIMEOUT = 30
+
+# Persistent connections, one per thread and database file
+_local = threading.local()
+
+# Return this thread's persistent connection to the given database, opening it if needed
+def get_connection(db_path):
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(db_path)
+    if conn is None:
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT, cached_statements=STATEMENT_CACHE_SIZE)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        connections[db_path] = conn
+        logging.debug(f"Opened connection to {db_path} for thread {threading.current_thread().name}")
+    return conn
+
+# Close this thread's connection to the given database
+def close_connection(db_path):
+    connections = getattr(_local, "connections", None)
+    if connections and db_path in connections:
+        connections.pop(db_path).close()
@@ -0,0 +1,139 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import numpy as np
+import face_recognition
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+# Define constants for file paths and other configurations
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+DB_ENCODINGS_PATH = os.path.join(DATA_DIR, "encodings.db")
+
+"""
+    This class keeps a persistent on-disk cache of the face encodings
+    computed from the student photos. Entries are keyed by photo path and
+    validated with the file size, modification time and content hash, so
+    only new or changed photos are re-encoded and entries for removed
+    photos or students are evicted from the directory being loaded.
+"""
+class EncodingCache:
+    def __init__(self, db_path=DB_ENCODINGS_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.db_init()
+
+    # Connect to the cache database
+    def db_connect(self):
+        try:
+            return sqlite3.connect(self.db_path)
+        except sqlite3.Error as e:
+            logging.error(f"Error connecting to encoding cache: {e}")
+            return None
+
+    # Initialize the encodings table
+    def db_init(self):
+        try:
+            with self.db_connect() as conn:
+                # A NULL encoding records a photo without a detectable face,
+                # so it is not retried until the file changes
+                conn.execute('''CREATE TABLE IF NOT EXISTS ENCODINGS (
+                                Photo_path TEXT PRIMARY KEY,
+                                Size INTEGER NOT NULL,
+                                Mtime_ns INTEGER NOT NULL,
+                                Sha1 TEXT NOT NULL,
+                                Encoding BLOB
+                                );''')
+        except sqlite3.Error as e:
+            logging.error(f"Error creating encoding cache table: {e}")
+
+    # Compute the content hash of a photo
+    def file_hash(self, photo_path):
+        sha1 = hashlib.sha1()
+        with open(photo_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                sha1.update(chunk)
+        return sha1.hexdigest()
+
+    # Compute the face encoding of a photo, or None if no face is found
+    def encode_photo(self, photo_path):
+        photo_load = face_recognition.load_image_file(photo_path)
+        photo_encodings = face_recognition.face_encodings(photo_load, model='small')
+        if photo_encodings:
+            return np.asarray(photo_encodings[0], dtype=np.float64)
+        return None
+
+    # Return the encodings for the given names, re-encoding only new or changed photos
+    def load_encodings(self, names, photo_dir, on_encode=None):
+        known_face_encodings = []
+        known_face_names = []
+        stats = {"cached": 0, "encoded": 0, "evicted": 0}
+        try:
+            with self.db_connect() as conn:
+                cached = {row[0]: row[1:] for row in conn.execute(
+                    'SELECT Photo_path, Size, Mtime_ns, Sha1, Encoding FROM ENCODINGS')}
+                current_paths = set()
+                for name in names:
+                    photo_path = os.path.abspath(os.path.join(photo_dir, f"{name}.jpg"))
+                    if not os.path.exists(photo_path):
+                        logging.error(f"No photo found for {name}")
+                        continue
+                    current_paths.add(photo_path)
+                    try:
+                        encoding = self.lookup(conn, cached.get(photo_path), photo_path, name, on_encode, stats)
+                    except Exception as e:
+                        logging.error(f"Error processing {name}: {e}")
+                        continue
+                    if encoding is None:
+                        logging.error(f"No face encodings found for {name}")
+                        continue
+                    known_face_encodings.append(encoding)
+                    known_face_names.append(name)
+
+                # Evict entries for photos or students that no longer exist; other photo
+                # directories share the cache, so only this directory's entries are checked
+                photo_prefix = os.path.join(os.path.abspath(photo_dir), '')
+                stale = [(path,) for path in cached if path.startswith(photo_prefix) and path not in current_paths]
+                if stale:
+                    conn.executemany('DELETE FROM ENCODINGS WHERE Photo_path = ?', stale)
+                stats["evicted"] = len(stale)
+            logging.info(f"Encoding cache: {stats['cached']} cached, {stats['encoded']} encoded, {stats['evicted']} evicted")
+        except sqlite3.Error as e:
+            logging.error(f"Error loading encoding cache: {e}")
+        return known_face_encodings, known_face_names
+
+    # Validate a cache entry against the photo on disk and refresh it if needed
+    def lookup(self, conn, entry, photo_path, name, on_encode, stats):
+        stat = os.stat(photo_path)
+        if entry is not None:
+            size, mtime_ns, sha1, blob = entry
+            if size == stat.st_size and mtime_ns == stat.st_mtime_ns:
+                stats["cached"] += 1
+                return self.decode(blob)
+            # The file was touched; only re-encode if the content changed
+            file_sha1 = self.file_hash(photo_path)
+            if file_sha1 == sha1:
+                conn.execute('UPDATE ENCODINGS SET Size = ?, Mtime_ns = ? WHERE Photo_path = ?',
+                             (stat.st_size, stat.st_mtime_ns, photo_path))
+                stats["cached"] += 1
+                return self.decode(blob)
+        else:
+            file_sha1 = self.file_hash(photo_path)
+
+        if on_encode is not None:
+            on_encode(name)
+        encoding = self.encode_photo(photo_path)
+        blob = encoding.tobytes() if encoding is not None else None
+        conn.execute('INSERT OR REPLACE INTO ENCODINGS (Photo_path, Size, Mtime_ns, Sha1, Encoding) VALUES (?, ?, ?, ?, ?)',
+                     (photo_path, stat.st_size, stat.st_mtime_ns, file_sha1, blob))
+        stats["encoded"] += 1
+        return encoding
+
+    # Convert a stored blob back into an encoding
+    def decode(self, blob):
+        if blob is None:
+            return None
+        return np.frombuffer(blob, dtype=np.float64).copy()
@@ -0,0 +1,253 @@
+import cv2
+import hashlib
+import json
+import os
+import platform
+import re
+import time
+import numpy as np
+from openvino.runtime import AsyncInferQueue, Core
+import face_recognition
+import logging
+from config import (MODEL_DIR, MODEL_PRECISION, MODEL_PRECISIONS, MODEL_VARIANT_PATH, OPENVINO_CACHE_DIR, OPENVINO_DEVICE,
+                    OPENVINO_INFER_REQUESTS, OPENVINO_PERFORMANCE_HINT)
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+# Input size of face-detection-adas-0001
+INPUT_WIDTH = 672
+INPUT_HEIGHT = 384
+CONFIDENCE_THRESHOLD = 0.5
+MIN_FACE_SIZE = 20
+
+# Return the compiled-model cache directory of a model on a device
+def model_cache_dir(model_path, model_bin, device):
+    digest = hashlib.sha1()
+    for path in (model_path, model_bin):
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    device_key = re.sub(r"[^A-Za-z0-9]+", "_", device)
+    return os.path.join(OPENVINO_CACHE_DIR, f"{digest.hexdigest()}-{device_key}")
+
+# Create an OpenVINO core that caches the compiled blobs of a model on disk
+def create_core(model_path, model_bin, device):
+    core = Core()
+    if OPENVINO_CACHE_DIR:
+        try:
+            core.set_property({"CACHE_DIR": model_cache_dir(model_path, model_bin, device)})
+        except Exception as e:
+            logging.warning(f"Compiled model cache disabled: {e}")
+    return core
+
+"""
+    This class wraps the OpenVINO face detection model. It has no Qt
+    dependency so it can be used by the recognition thread as well as
+    by other front ends. Frames are detected either synchronously or
+    through an async infer request queue with several requests in flight.
+"""
+class FaceDetector:
+    def __init__(self, model_path, model_bin, device=OPENVINO_DEVICE, performance_hint=OPENVINO_PERFORMANCE_HINT,
+                 infer_requests=OPENVINO_INFER_REQUESTS):
+        self.model_path = model_path
+        self.model_bin = model_bin
+        self.device = device
+        self.performance_hint = performance_hint
+        self.infer_requests = infer_requests
+        self.infer_queue = None
+        self.compiled_model = self.initialize_model(self.model_path, self.model_bin)
+        self.input_blob, self.output_blob = self.extract_input_output_blobs(self.compiled_model)
+        # Synchronous detections reuse one infer request and one resize buffer
+        self.infer_request = self.compiled_model.create_infer_request()
+        self.resized = np.empty((INPUT_HEIGHT, INPUT_WIDTH, 3), dtype=np.uint8)
+
+    def initialize_model(self, model_path, model_bin):
+        self.model_path = model_path
+        self.model_bin = model_bin
+        try:
+            begin = time.perf_counter()
+            # The blob compiled on a previous start is loaded from the cache when the model did not change
+            ie = create_core(self.model_path, self.model_bin, self.device)
+            net = ie.read_model(model=self.model_path, weights=self.model_bin)
+            compiled_model = ie.compile_model(model=net, device_name=self.device,
+                                              config={"PERFORMANCE_HINT": self.performance_hint})
+            precision = os.path.basename(os.path.dirname(self.model_path))
+            logging.info(f"OpenVINO model loaded and compiled in {time.perf_counter() - begin:.2f}s "
+                         f"({precision} on {self.device}, {self.performance_hint} hint).")
+        except Exception as e:
+            logging.error(f"Error initializing OpenVINO: {e}")
+            exit(1)
+        return compiled_model
+
+    def extract_input_output_blobs(self, compiled_model):
+        try:
+            input_blob = compiled_model.input(0).any_name
+            output_blob = compiled_model.output(0).any_name
+            return input_blob, output_blob
+        except Exception as e:
+            logging.error(f"Error extracting input/output blobs: {e}")
+            exit(1)
+
+    # Resize a BGR frame and write it into an NCHW input tensor in place (by default the one of
+    # the synchronous infer request)
+    def preprocess(self, frame, input_data=None):
+        if input_data is None:
+            input_data = self.infer_request.get_input_tensor(0).data
+        cv2.resize(frame, (INPUT_WIDTH, INPUT_HEIGHT), dst=self.resized)
+        np.copyto(input_data[0], self.resized.transpose(2, 0, 1))
+        return input_data
+
+    # Run the network on the input written by preprocess
+    def infer(self):
+        self.infer_request.infer()
+        return self.infer_request.get_output_tensor(0).data
+
+    # Turn the raw detections into an int32 array of (xmin, ymin, xmax, ymax) boxes in frame coordinates
+    def postprocess(self, detections, frame_shape):
+        height, width = frame_shape[:2]
+        # Rows are (image_id, label, confidence, xmin, ymin, xmax, ymax) with normalized coordinates
+        rows = detections.reshape(-1, 7)
+        rows = rows[rows[:, 2] >= CONFIDENCE_THRESHOLD]
+        bounds = np.array([width, height, width, height], dtype=np.int32)
+        boxes = (rows[:, 3:7] * bounds).astype(np.int32)
+        np.clip(boxes, 0, bounds, out=boxes)
+        # Skip small or invalid regions
+        sizes = boxes[:, 2:] - boxes[:, :2]
+        return boxes[(sizes >= MIN_FACE_SIZE).all(axis=1)]
+
+    # Detect faces in a BGR frame and return their (xmin, ymin, xmax, ymax) boxes
+    def detect(self, frame):
+        self.preprocess(frame)
+        return self.postprocess(self.infer(), frame.shape)
+
+    # Run one inference on a blank frame so the first camera frame does not pay the warm-up cost
+    def warm_up(self):
+        begin = time.perf_counter()
+        self.detect(np.zeros((INPUT_HEIGHT, INPUT_WIDTH, 3), dtype=np.uint8))
+        logging.info(f"Face detector warmed up in {(time.perf_counter() - begin) * 1000:.1f} ms.")
+
+    # Create the async infer request queue; callback(boxes, userdata, elapsed_ms) runs on an OpenVINO thread
+    def start_async(self, callback):
+        jobs = self.infer_requests or self.compiled_model.get_property("OPTIMAL_NUMBER_OF_INFER_REQUESTS")
+        self.infer_queue = AsyncInferQueue(self.compiled_model, jobs)
+
+        def completed(request, userdata):
+            frame_shape, started_at, payload = userdata
+            try:
+                boxes = self.postprocess(request.get_output_tensor(0).data, frame_shape)
+            except Exception as e:
+                logging.error(f"Error reading the detection results: {e}")
+                boxes = []
+            callback(boxes, payload, (time.perf_counter() - started_at) * 1000)
+
+        self.infer_queue.set_callback(completed)
+        logging.info(f"Face detection runs with {jobs} infer requests in flight.")
+        return jobs
+
+    # Queue a BGR frame for detection, blocking while every infer request is busy
+    def detect_async(self, frame, userdata):
+        started_at = time.perf_counter()
+        # The frame is written straight into the input tensor of the next idle request
+        request = self.infer_queue[self.infer_queue.get_idle_request_id()]
+        self.preprocess(frame, request.get_input_tensor(0).data)
+        self.infer_queue.start_async(userdata=(frame.shape, started_at, userdata))
+
+    # Wait for the frames still in flight
+    def wait_all(self):
+        if self.infer_queue is not None:
+            self.infer_queue.wait_all()
+
+# Return the (xml, bin) paths of a precision variant, or None if any of its files is missing
+def model_variant(precision):
+    model_path = os.path.join(MODEL_DIR, precision, "face-detection-adas-0001.xml")
+    model_bin = os.path.splitext(model_path)[0] + ".bin"
+    if os.path.exists(model_path) and os.path.exists(model_bin):
+        return model_path, model_bin
+    return None
+
+# Time one synchronous inference of a model variant in milliseconds (median of several runs)
+def benchmark_variant(core, model_path, model_bin, device, runs=20):
+    net = core.read_model(model=model_path, weights=model_bin)
+    compiled_model = core.compile_model(model=net, device_name=device, config={"PERFORMANCE_HINT": "LATENCY"})
+    request = compiled_model.create_infer_request()
+    input_data = np.zeros((1, 3, INPUT_HEIGHT, INPUT_WIDTH), dtype=np.float32)
+    for _ in range(3):
+        request.infer({0: input_data})
+    timings = []
+    for _ in range(runs):
+        begin = time.perf_counter()
+        request.infer({0: input_data})
+        timings.append((time.perf_counter() - begin) * 1000)
+    return float(np.median(timings))
+
+# Benchmark the available precision variants on a device and return the paths of the fastest
+def select_model_variant(device=OPENVINO_DEVICE, variant_path=MODEL_VARIANT_PATH):
+    variants = {precision: model_variant(precision) for precision in MODEL_PRECISIONS}
+    variants = {precision: paths for precision, paths in variants.items() if paths is not None}
+    if not variants:
+        raise FileNotFoundError(f"No face detection model found in {MODEL_DIR}")
+    # The choice only holds for the same device, CPU and set of variants
+    key = {"device": device, "processor": platform.processor() or platform.machine(), "variants": sorted(variants)}
+    try:
+        with open(variant_path) as f:
+            saved = json.load(f)
+        if saved.get("key") == key and saved.get("precision") in variants:
+            logging.info(f"Using the {saved['precision']} face detection model selected earlier.")
+            return variants[saved["precision"]]
+    except (OSError, ValueError):
+        pass
+
+    timings = {}
+    for precision, (model_path, model_bin) in variants.items():
+        try:
+            core = create_core(model_path, model_bin, device)
+            timings[precision] = benchmark_variant(core, model_path, model_bin, device)
+            logging.info(f"{precision} face detection model: {timings[precision]:.2f} ms per frame on {device}")
+        except Exception as e:
+            logging.warning(f"Skipping the {precision} face detection model: {e}")
+    if not timings:
+        raise RuntimeError(f"No face detection model could be compiled for {device}")
+    precision = min(timings, key=timings.get)
+    logging.info(f"Selected the {precision} face detection model.")
+    try:
+        os.makedirs(os.path.dirname(variant_path), exist_ok=True)
+        with open(variant_path, "w") as f:
+            json.dump({"key": key, "precision": precision, "timings_ms": timings}, f, indent=2)
+    except OSError as e:
+        logging.warning(f"Could not save the model selection: {e}")
+    return variants[precision]
+
+# Return the (xml, bin) paths of the configured model precision
+def resolve_model(precision=MODEL_PRECISION, device=OPENVINO_DEVICE):
+    if precision.lower() == "auto":
+        return select_model_variant(device)
+    paths = model_variant(precision)
+    if paths is None:
+        raise FileNotFoundError(f"The {precision} face detection model is missing in {MODEL_DIR}")
+    return paths
+
+# Encode the faces at the given detector boxes of an RGB frame in a single call
+def encode_faces(rgb_frame, boxes):
+    height, width = rgb_frame.shape[:2]
+    # face_recognition expects (top, right, bottom, left) locations inside the frame
+    locations = [(max(int(ymin), 0), min(int(xmax), width), min(int(ymax), height), max(int(xmin), 0))
+                 for xmin, ymin, xmax, ymax in boxes]
+    return face_recognition.face_encodings(rgb_frame, known_face_locations=locations)
+
+# Downscale a BGR frame to fit a (width, height) display area and convert it to RGB
+def display_frame(frame, size):
+    width, height = size
+    scale = min(width / frame.shape[1], height / frame.shape[0], 1.0)
+    if scale < 1.0:
+        display_size = (max(1, int(frame.shape[1] * scale)), max(1, int(frame.shape[0] * scale)))
+        frame = cv2.resize(frame, display_size, interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+# Draw the tracked faces and their identities on a frame
+def draw_tracks(frame, tracks):
+    for track in tracks:
+        xmin, ymin, xmax, ymax = (int(value) for value in track.box)
+        name = track.name or "Unknown"
+        cv2.rectangle(frame, (xmin, ymin), (xmax, ymax), (111, 218, 156), 2)
+        cv2.putText(frame, name, (xmin, ymin - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (111, 218, 156), 2)
@@ -0,0 +1,151 @@
+import hashlib
+import logging
+import os
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+# Below this many identities brute force is already fast enough
+AUTO_EXACT_LIMIT = 5000
+
+"""
+    This class is the exact identity index. It keeps the known encodings
+    as one contiguous float32 matrix and answers nearest-neighbour queries
+    for a whole batch of faces with a single matrix product.
+"""
+class ExactIndex:
+    backend = "exact"
+
+    def __init__(self, known_matrix):
+        self.known_matrix = np.ascontiguousarray(known_matrix, dtype=np.float32)
+        # Squared norms are precomputed once for the distance expansion
+        self.known_sq_norms = np.einsum('ij,ij->i', self.known_matrix, self.known_matrix)
+
+    def __len__(self):
+        return len(self.known_matrix)
+
+    # Compute the distance matrix between the queries and the given rows
+    def distances(self, queries, matrix=None, sq_norms=None):
+        if matrix is None:
+            matrix, sq_norms = self.known_matrix, self.known_sq_norms
+        query_sq_norms = np.einsum('ij,ij->i', queries, queries)
+        # ||q - k||^2 = ||q||^2 + ||k||^2 - 2 q.k
+        sq_dist = query_sq_norms[:, None] + sq_norms[None, :] - 2.0 * (queries @ matrix.T)
+        np.maximum(sq_dist, 0.0, out=sq_dist)
+        return np.sqrt(sq_dist, out=sq_dist)
+
+    # Return the index and distance of the nearest known encoding for each query
+    def search(self, queries):
+        dist = self.distances(queries)
+        best = np.argmin(dist, axis=1)
+        return best, dist[np.arange(len(best)), best]
+
+    # Return the arrays needed to restore the index
+    def state(self):
+        return {}
+
+"""
+    This class is the approximate identity index (IVF). The encodings are
+    clustered with k-means into inverted lists; a query only scans the
+    lists of its nprobe closest centroids, so its cost grows with the list
+    size instead of the whole enrollment.
+"""
+class IVFIndex(ExactIndex):
+    backend = "ivf"
+
+    def __init__(self, known_matrix, nlist=None, nprobe=8, iterations=10, seed=0, state=None):
+        super().__init__(known_matrix)
+        self.nprobe = nprobe
+        if state is not None:
+            self.centroids = state["centroids"]
+            self.order = state["order"]
+            self.offsets = state["offsets"]
+        else:
+            self.train(nlist or max(1, int(4 * np.sqrt(len(self.known_matrix)))), iterations, seed)
+        self.centroid_sq_norms = np.einsum('ij,ij->i', self.centroids, self.centroids)
+        # k-means can leave lists without any encoding; they are never probed
+        self.empty_lists = np.diff(self.offsets) == 0
+        # Rows are stored grouped by list so a probe is one contiguous slice
+        self.list_matrix = np.ascontiguousarray(self.known_matrix[self.order])
+        self.list_sq_norms = self.known_sq_norms[self.order]
+
+    # Cluster the encodings with k-means and build the inverted lists
+    def train(self, nlist, iterations, seed):
+        rng = np.random.default_rng(seed)
+        count = len(self.known_matrix)
+        nlist = min(nlist, count)
+        sample = self.known_matrix
+        if count > 256 * nlist:
+            sample = self.known_matrix[rng.choice(count, 256 * nlist, replace=False)]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmin(self.distances(sample, centroids, np.einsum('ij,ij->i', centroids, centroids)), axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            counts = np.bincount(assign, minlength=nlist)
+            filled = counts > 0
+            centroids[filled] = sums[filled] / counts[filled, None]
+        self.centroids = centroids
+        assign = np.empty(count, dtype=np.int64)
+        # Assign in chunks to bound the size of the distance matrix
+        for start in range(0, count, 8192):
+            chunk = self.known_matrix[start:start + 8192]
+            assign[start:start + 8192] = np.argmin(
+                self.distances(chunk, centroids, np.einsum('ij,ij->i', centroids, centroids)), axis=1)
+        self.order = np.argsort(assign, kind='stable')
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(assign, minlength=nlist))))
+
+    # Return the approximate nearest known encoding for each query
+    def search(self, queries):
+        probes = min(self.nprobe, int(np.count_nonzero(~self.empty_lists)))
+        centroid_dist = self.distances(queries, self.centroids, self.centroid_sq_norms)
+        centroid_dist[:, self.empty_lists] = np.inf
+        nearest_lists = np.argpartition(centroid_dist, probes - 1, axis=1)[:, :probes]
+        best = np.empty(len(queries), dtype=np.int64)
+        best_dist = np.empty(len(queries), dtype=np.float32)
+        for row, lists in enumerate(nearest_lists):
+            rows = np.concatenate([np.arange(self.offsets[i], self.offsets[i + 1]) for i in lists])
+            dist = self.distances(queries[row:row + 1], self.list_matrix[rows], self.list_sq_norms[rows])[0]
+            position = int(np.argmin(dist))
+            best[row] = self.order[rows[position]]
+            best_dist[row] = dist[position]
+        return best, best_dist
+
+    # Return the arrays needed to restore the index
+    def state(self):
+        return {"centroids": self.centroids, "order": self.order, "offsets": self.offsets}
+
+# Resolve the configured backend name for an enrollment of the given size
+def resolve_backend(backend, count):
+    if backend == "auto":
+        return "exact" if count < AUTO_EXACT_LIMIT else "ivf"
+    if backend not in ("exact", "ivf"):
+        raise ValueError(f"Unknown face index backend: {backend}")
+    return backend
+
+# Build the requested index, or load it from disk if the enrollment did not change
+def build_index(known_matrix, backend="auto", nprobe=8, index_path=None):
+    known_matrix = np.ascontiguousarray(known_matrix, dtype=np.float32).reshape(-1, 128)
+    backend = resolve_backend(backend, len(known_matrix))
+    if backend == "exact" or len(known_matrix) == 0:
+        return ExactIndex(known_matrix)
+
+    digest = hashlib.sha1(known_matrix.tobytes()).hexdigest()
+    if index_path and os.path.exists(index_path):
+        try:
+            with np.load(index_path) as saved:
+                if str(saved["digest"]) == digest and str(saved["backend"]) == backend:
+                    logging.info(f"Loaded {backend} face index from {index_path}")
+                    return IVFIndex(known_matrix, nprobe=nprobe, state=dict(saved))
+        except Exception as e:
+            logging.error(f"Error loading face index: {e}")
+
+    index = IVFIndex(known_matrix, nprobe=nprobe)
+    logging.info(f"Built {backend} face index with {len(index.centroids)} lists for {len(known_matrix)} identities")
+    if index_path:
+        try:
+            np.savez(index_path, digest=digest, backend=backend, **index.state())
+        except Exception as e:
+            logging.error(f"Error saving face index: {e}")
+    return index
@@ -0,0 +1,46 @@
+import logging
+import numpy as np
+from face_index import ExactIndex, build_index
+from config import FACE_INDEX_BACKEND, FACE_INDEX_NPROBE, FACE_INDEX_PATH
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+# Same default tolerance as face_recognition.compare_faces
+DEFAULT_TOLERANCE = 0.6
+
+"""
+    This class matches face encodings against the known students.
+    All faces of a frame are looked up in the identity index in a single
+    batch, and each face resolves to its closest identity rather than
+    the first one under the tolerance.
+"""
+class FaceMatcher:
+    def __init__(self, known_face_encodings, known_face_names, tolerance=DEFAULT_TOLERANCE, index=None):
+        self.known_face_names = list(known_face_names)
+        self.tolerance = tolerance
+        if index is None:
+            index = ExactIndex(np.asarray(known_face_encodings, dtype=np.float32).reshape(-1, 128))
+        self.index = index
+        if len(self.known_face_names) != len(self.index):
+            raise ValueError("Number of names and encodings must match")
+        logging.info(f"Face matcher ready with {len(self.known_face_names)} identities ({self.index.backend} index).")
+
+    # Return the closest identity and its distance for every encoding
+    def match(self, face_encodings):
+        if len(face_encodings) == 0:
+            return []
+        if len(self.known_face_names) == 0:
+            return [("Unknown", float("inf"))] * len(face_encodings)
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, 128)
+        best, best_dist = self.index.search(queries)
+        results = []
+        for index, distance in zip(best.tolist(), best_dist.tolist()):
+            name = self.known_face_names[index] if distance <= self.tolerance else "Unknown"
+            results.append((name, distance))
+        return results
+
+# Build the configured identity index (or load it if the enrollment did not change) and its matcher
+def build_matcher(known_face_encodings, known_face_names):
+    index = build_index(known_face_encodings, FACE_INDEX_BACKEND, FACE_INDEX_NPROBE, FACE_INDEX_PATH)
+    return FaceMatcher(known_face_encodings, known_face_names, index=index)
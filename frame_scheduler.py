@@ -0,0 +1,81 @@
+import logging
+import threading
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+"""
+    This class decides which captured frames are processed. It keeps
+    moving averages of the measured stage timings and of how many faces
+    need encoding, estimates the cost of the slowest stage for the next
+    frame and spaces processed frames so the pipeline stays within its
+    processing budget. When the measured end-to-end latency exceeds the
+    target it backs off further, so the system degrades by processing
+    fewer frames instead of building a backlog.
+"""
+class FrameScheduler:
+    def __init__(self, target_latency_ms=250.0, utilization=0.8, max_fps=15.0, smoothing=0.2):
+        self.target_latency_ms = target_latency_ms
+        # Fraction of the wall time the busiest stage may spend working
+        self.utilization = utilization
+        self.min_interval_ms = 1000.0 / max_fps if max_fps > 0 else 0.0
+        self.smoothing = smoothing
+        self.stage_ms = {}
+        self.encode_ms_per_face = None
+        self.encoded_per_frame = 0.0
+        self.faces = 0
+        self.latency_ms = None
+        self.backoff = 1.0
+        self.last_processed = None
+        self.processed = 0
+        self.skipped = 0
+        self.lock = threading.Lock()
+
+    # Blend a new sample into a moving average
+    def average(self, current, sample):
+        if current is None:
+            return sample
+        return current + self.smoothing * (sample - current)
+
+    # Record the time a stage spent on one frame
+    def record_stage(self, stage, elapsed_ms):
+        with self.lock:
+            self.stage_ms[stage] = self.average(self.stage_ms.get(stage), elapsed_ms)
+
+    # Record the outcome of the recognition stage for one frame
+    def record_recognition(self, elapsed_ms, faces, encoded_faces, encode_ms, latency_ms):
+        with self.lock:
+            self.faces = faces
+            if encoded_faces:
+                self.encode_ms_per_face = self.average(self.encode_ms_per_face, encode_ms / encoded_faces)
+            self.encoded_per_frame = self.average(self.encoded_per_frame, encoded_faces)
+            self.stage_ms["recognition"] = self.average(self.stage_ms.get("recognition"), elapsed_ms - encode_ms)
+            self.latency_ms = self.average(self.latency_ms, latency_ms)
+            # Back off while the latency is over target, recover once it is under
+            if self.latency_ms > self.target_latency_ms:
+                self.backoff = min(self.backoff * 1.25, 8.0)
+            else:
+                self.backoff = max(self.backoff * 0.8, 1.0)
+
+    # Estimate the time between processed frames the pipeline can sustain
+    def interval_ms(self):
+        expected_encoding = (self.encode_ms_per_face or 0.0) * self.encoded_per_frame if self.faces else 0.0
+        recognition_ms = self.stage_ms.get("recognition", 0.0) + expected_encoding
+        bottleneck_ms = max([recognition_ms] + [ms for stage, ms in self.stage_ms.items() if stage != "recognition"])
+        return max(self.min_interval_ms, bottleneck_ms / self.utilization * self.backoff)
+
+    # Decide whether the frame captured at now (in seconds) should be processed
+    def should_process(self, now):
+        with self.lock:
+            if self.last_processed is not None and (now - self.last_processed) * 1000.0 < self.interval_ms():
+                self.skipped += 1
+                return False
+            self.last_processed = now
+            self.processed += 1
+            return True
+
+    # Summarize the scheduling decisions
+    def summary(self):
+        with self.lock:
+            return (f"{self.processed} frames processed, {self.skipped} skipped, "
+                    f"interval {self.interval_ms():.1f} ms, latency {self.latency_ms or 0.0:.1f} ms")
@@ -0,0 +1,66 @@
+import cv2
+import logging
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+"""
+    This class decides whether the face detector has to run on a frame.
+    Every captured frame is downscaled to grayscale and compared with a
+    running-average background; detection only runs when enough of the
+    scene changed since the last detection, or when the last detection
+    is older than the refresh interval. Otherwise the previous boxes are
+    reused, so a static scene costs one small resize per frame.
+"""
+class MotionGate:
+    def __init__(self, sensitivity=0.005, pixel_delta=25, refresh_seconds=5.0, width=160, learning_rate=0.05):
+        # Fraction of the downscaled pixels that must change; 0 disables the gate
+        self.sensitivity = sensitivity
+        self.pixel_delta = pixel_delta
+        self.width = width
+        self.learning_rate = learning_rate
+        self.refresh_seconds = refresh_seconds
+        self.background = None
+        self.changed = True
+        self.last_detection = None
+        self.detections = 0
+        self.skipped = 0
+
+    # Downscale a BGR frame to a blurred grayscale thumbnail
+    def thumbnail(self, frame):
+        height = max(1, round(frame.shape[0] * self.width / frame.shape[1]))
+        small = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    # Compare a captured frame with the background and fold it into the background
+    def update(self, frame):
+        if self.sensitivity <= 0:
+            return True
+        gray = self.thumbnail(frame)
+        if self.background is None or self.background.shape != gray.shape:
+            self.background = gray.astype(np.float32)
+            self.changed = True
+            return True
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self.background))
+        _, mask = cv2.threshold(diff, self.pixel_delta, 255, cv2.THRESH_BINARY)
+        moved = cv2.countNonZero(mask) >= self.sensitivity * mask.size
+        cv2.accumulateWeighted(gray, self.background, self.learning_rate)
+        self.changed = self.changed or moved
+        return moved
+
+    # Check if the detector has to run on the frame processed at now (in seconds)
+    def should_detect(self, now):
+        refresh = self.last_detection is None or now - self.last_detection >= self.refresh_seconds
+        if self.sensitivity > 0 and not self.changed and not refresh:
+            self.skipped += 1
+            return False
+        self.changed = False
+        self.last_detection = now
+        self.detections += 1
+        return True
+
+    # Summarize the gating decisions
+    def summary(self):
+        return f"{self.detections} detections, {self.skipped} reused"
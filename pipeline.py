@@ -0,0 +1,121 @@
+import collections
+import logging
+import queue
+import threading
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+"""
+    This class is a bounded queue that never blocks the producer.
+    When it is full the oldest item is discarded to make room, so a slow
+    consumer always works on the most recent data instead of a backlog.
+"""
+class DropOldestQueue(queue.Queue):
+    def __init__(self, maxsize=1):
+        super().__init__(maxsize)
+        self.dropped = 0
+
+    # Put an item, discarding the oldest one if the queue is full
+    def put(self, item, block=True, timeout=None):
+        with self.not_full:
+            if self.maxsize > 0 and self._qsize() >= self.maxsize:
+                self._get()
+                self.unfinished_tasks -= 1
+                self.dropped += 1
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+"""
+    This class holds only the newest item handed from one thread to
+    another. Putting an item replaces the one that was not taken yet,
+    so a slow reader never falls behind.
+"""
+class LatestSlot:
+    def __init__(self):
+        self.item = None
+        self.dropped = 0
+        self.lock = threading.Lock()
+
+    # Store an item, replacing the one that was not taken yet
+    def put(self, item):
+        with self.lock:
+            if self.item is not None:
+                self.dropped += 1
+            self.item = item
+
+    # Return the newest item, or None if nothing new was put since the last call
+    def take(self):
+        with self.lock:
+            item, self.item = self.item, None
+            return item
+
+"""
+    This class holds one frame and what the pipeline stages learned about it.
+"""
+class FramePacket:
+    __slots__ = ("frame_id", "frame", "captured_at", "boxes", "detect")
+
+    def __init__(self, frame_id, frame, captured_at, detect=True):
+        self.frame_id = frame_id
+        self.frame = frame
+        self.captured_at = captured_at
+        self.boxes = []
+        # False when the scene did not change and the previous boxes still apply
+        self.detect = detect
+
+"""
+    This class hands packets on in the order they were submitted, even
+    when the asynchronous work on them completes out of order.
+"""
+class ReorderBuffer:
+    def __init__(self, release):
+        self.release = release
+        self.pending = collections.deque()
+        self.done = set()
+        self.lock = threading.Lock()
+
+    # Register a packet before its work starts
+    def submit(self, packet):
+        with self.lock:
+            self.pending.append(packet)
+
+    # Mark a packet as completed and release the completed packets at the head
+    def complete(self, packet):
+        with self.lock:
+            self.done.add(packet.frame_id)
+            while self.pending and self.pending[0].frame_id in self.done:
+                head = self.pending.popleft()
+                self.done.discard(head.frame_id)
+                self.release(head)
+
+"""
+    This class runs one stage of the recognition pipeline on its own thread.
+    It takes items from its input queue (or produces them itself when it
+    has none), applies its work function and forwards non-None results to
+    its output queue until the shared stop event is set.
+"""
+class PipelineStage(threading.Thread):
+    def __init__(self, name, work, stop_event, input_queue=None, output_queue=None):
+        super().__init__(name=name, daemon=True)
+        self.work = work
+        self.stop_event = stop_event
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                item = None
+                if self.input_queue is not None:
+                    try:
+                        item = self.input_queue.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                result = self.work(item)
+                if result is not None and self.output_queue is not None:
+                    self.output_queue.put(result)
+        except Exception as e:
+            logging.error(f"An error occurred in the {self.name} stage: {e}")
+            self.stop_event.set()
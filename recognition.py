@@ -1,43 +1,84 @@
 import cv2
-import numpy as np
-from openvino.runtime import Core
-import face_recognition
 import logging
+import multiprocessing
+import queue
+import threading
+import time
 from PyQt6.QtCore import QThread, pyqtSignal
-from DB_management import DBmanagement
+from PyQt6.QtGui import QImage
+from attendance_writer import AttendanceWriter
+from camera_worker import parse_capture_source, run_camera_worker
+from face_detector import FaceDetector, display_frame, draw_tracks, encode_faces
+from tracker import FaceTracker
+from frame_scheduler import FrameScheduler
+from motion import MotionGate
+from config import (MAX_PROCESS_FPS, MOTION_PIXEL_DELTA, MOTION_REFRESH_SECONDS, MOTION_SENSITIVITY,
+                    PROCESSING_UTILIZATION, TARGET_LATENCY_MS)
+from pipeline import DropOldestQueue, FramePacket, LatestSlot, PipelineStage, ReorderBuffer
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
+"""
+    This class is a frame ready for display: a QImage and the RGB array
+    holding its pixels, which has to stay alive as long as the image.
+"""
+class DisplayFrame:
+    __slots__ = ("image", "pixels")
+
+    def __init__(self, rgb_frame):
+        height, width = rgb_frame.shape[:2]
+        self.pixels = rgb_frame
+        self.image = QImage(rgb_frame.data, width, height, rgb_frame.strides[0], QImage.Format.Format_RGB888)
+
 """
     This class handles face recognition using a separate thread.
-    It captures video frames from the webcam, processes them to recognize faces,
-    and emits signals with the frame and recognized attendance information.
+    It runs a pipeline of capture, detection and encoding/matching
+    stages, each on its own thread and connected by bounded drop-oldest
+    queues (detection keeps several frames in flight on OpenVINO infer
+    requests), hands recognized students to a background attendance writer
+    and emits signals with the attendance information. The newest frame,
+    already scaled for display, waits in a slot the GUI polls. Faces are tracked across frames so each
+    person is encoded once per track rather than on every frame.
     """
 class FaceRecognitionThread(QThread):
-    # Define signals for frame and attendance
-    frame_signal = pyqtSignal(np.ndarray)
+    # Define signal for attendance
     attendance_signal = pyqtSignal(str, str)
 
-    def __init__(self, known_face_encodings, known_face_names, model_path, model_bin):
+    def __init__(self, matcher, model_path, model_bin, source=0, display_size=(380, 480)):
         try:
             super().__init__()
-            self.known_face_encodings = known_face_encodings
-            self.known_face_names = known_face_names
+            self.created_at = time.perf_counter()
+            self.first_frame_logged = False
+            self.matcher = matcher
             self.model_path = model_path
             self.model_bin = model_bin
+            self.source = source
+            self.display_size = display_size
+            self.display_slot = LatestSlot()
             self.cap = self.initialize_webcam()
-            self.compiled_model = self.initialize_model(self.model_path, self.model_bin)
-            self.input_blob, self.output_blob = self.extract_input_output_blobs(self.compiled_model)
-            self.running = True  
-            self.db = DBmanagement()
+            self.detector = FaceDetector(self.model_path, self.model_bin)
+            # Several frames are detected at once; the results are put back in capture order
+            self.infer_jobs = self.detector.start_async(self.on_detection)
+            self.reorder_buffer = ReorderBuffer(self.release_detection)
+            self.tracker = FaceTracker()
+            self.stop_event = threading.Event()
+            # Frame queues only hold the newest frames
+            self.frame_queue = DropOldestQueue(maxsize=1)
+            self.detection_queue = DropOldestQueue(maxsize=1)
+            self.scheduler = FrameScheduler(TARGET_LATENCY_MS, PROCESSING_UTILIZATION, MAX_PROCESS_FPS)
+            self.frame_counter = 0
+            self.motion_gate = MotionGate(MOTION_SENSITIVITY, MOTION_PIXEL_DELTA, MOTION_REFRESH_SECONDS)
+            self.last_boxes = []
+            # Attendance events are never dropped; they are written behind in batches
+            self.attendance_writer = AttendanceWriter(on_result=self.on_attendance_result)
         except Exception as e:
             logging.error(f"Error initializing FaceRecognitionThread: {e}")
             exit(1)
 
     def initialize_webcam(self):
         try:
-            cap = cv2.VideoCapture(0)
+            cap = cv2.VideoCapture(parse_capture_source(self.source))
             if not cap.isOpened():
                 logging.error("Error: Could not open webcam.")
                 exit(1)
@@ -46,102 +87,212 @@ class FaceRecognitionThread(QThread):
             logging.error(f"Error initializing webcam: {e}")
             exit(1)
 
-    def initialize_model(self, model_path, model_bin):
-        self.model_path = model_path
-        self.model_bin = model_bin
-        try:
-            ie = Core()
-            net = ie.read_model(model=self.model_path, weights=self.model_bin) 
-            compiled_model = ie.compile_model(model=net, device_name="MULTI:GPU,CPU")
-            logging.info("OpenVINO model loaded and compiled.")
-        except Exception as e:
-            logging.error(f"Error initializing OpenVINO: {e}")
-            exit(1)
-        return compiled_model
+    # Capture stage: read a frame from the webcam
+    def capture_frame(self, _):
+        ret, frame = self.cap.read()
+        if not ret:
+            logging.warning("Error: Could not read frame.")
+            self.stop_event.set()
+            return None
+
+        # Every frame feeds the motion background, even the skipped ones
+        self.motion_gate.update(frame)
+
+        # Let the scheduler skip frames the pipeline has no budget for
+        self.frame_counter += 1
+        captured_at = time.perf_counter()
+        if not self.scheduler.should_process(captured_at):
+            return None
+        return FramePacket(self.frame_counter, frame, captured_at, self.motion_gate.should_detect(captured_at))
+
+    # Detection stage: queue the frame on a free OpenVINO infer request
+    def detect_faces(self, packet):
+        self.reorder_buffer.submit(packet)
+        if packet.detect:
+            self.detector.detect_async(packet.frame, packet)
+        else:
+            self.reorder_buffer.complete(packet)
 
-    def extract_input_output_blobs(self, compiled_model):
+    # Infer request callback: store the face boxes of a frame
+    def on_detection(self, boxes, packet, elapsed_ms):
+        packet.boxes = boxes
+        # With several requests in flight a frame costs a share of its latency
+        self.scheduler.record_stage("detection", elapsed_ms / self.infer_jobs)
+        self.reorder_buffer.complete(packet)
+
+    # Hand the detected frames to the recognition stage in capture order
+    def release_detection(self, packet):
+        # A static scene keeps the boxes of the last detection before it
+        if packet.detect:
+            self.last_boxes = packet.boxes
+        else:
+            packet.boxes = self.last_boxes
+        self.detection_queue.put(packet)
+
+    # Encoding/matching stage: identify the faces and annotate the frame
+    def recognize_faces(self, packet):
+        begin = time.perf_counter()
+        frame = packet.frame
+        tracks = self.tracker.update(packet.boxes)
+
+        # Only new or uncertain tracks are encoded; the rest keep their identity
+        pending_tracks = [track for track in tracks if self.tracker.needs_encoding(track)]
+        face_encodings = []
+        encode_ms = 0.0
+        if pending_tracks:
+            # The detector boxes are reused as face locations, so dlib does not
+            # detect again and all faces are encoded from one RGB conversion
+            encode_begin = time.perf_counter()
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            face_encodings = encode_faces(rgb_frame, [track.box for track in pending_tracks])
+            encode_ms = (time.perf_counter() - encode_begin) * 1000
+
+        # Match all pending faces of the frame in one batch
+        for track, (name, distance) in zip(pending_tracks, self.matcher.match(face_encodings)):
+            if self.tracker.resolve(track, name, distance):
+                self.attendance_writer.submit(name, distance)
+
+        # Annotate the frame
+        draw_tracks(frame, tracks)
+
+        # Publish the frame scaled for display; an unread older frame is dropped
+        self.display_slot.put(DisplayFrame(display_frame(frame, self.display_size)))
+        now = time.perf_counter()
+        if not self.first_frame_logged:
+            self.first_frame_logged = True
+            logging.info(f"First recognized frame {now - self.created_at:.2f}s after the recognition thread was created.")
+        self.scheduler.record_recognition((now - begin) * 1000, len(tracks), len(face_encodings), encode_ms,
+                                          (now - packet.captured_at) * 1000)
+
+    # Persistence callback: report the outcome of an attendance event
+    def on_attendance_result(self, name, recorded):
+        self.attendance_signal.emit(name, "recorded" if recorded else "already recorded")
+
+    def run(self):
+        stages = [
+            PipelineStage("capture", self.capture_frame, self.stop_event, output_queue=self.frame_queue),
+            PipelineStage("detection", self.detect_faces, self.stop_event, self.frame_queue),
+            PipelineStage("recognition", self.recognize_faces, self.stop_event, self.detection_queue),
+        ]
         try:
-            input_blob = compiled_model.input(0).any_name
-            output_blob = compiled_model.output(0).any_name
-            return input_blob, output_blob
+            self.attendance_writer.start()
+            # Pay the first-inference cost before the camera loop starts
+            self.detector.warm_up()
+            for stage in stages:
+                stage.start()
+            self.stop_event.wait()
         except Exception as e:
-            logging.error(f"Error extracting input/output blobs: {e}")
-            exit(1)
+            logging.error(f"An error occurred during execution: {e}")
+
+        finally:
+            self.stop_event.set()
+            for stage in stages:
+                if stage.is_alive():
+                    stage.join()
+            self.detector.wait_all()
+            # Flush the attendance events that were still queued
+            self.attendance_writer.stop()
+            self.cap.release()
+            dropped = self.frame_queue.dropped + self.detection_queue.dropped
+            logging.info(f"Resources released, application closed ({dropped} stale frames dropped, "
+                         f"{self.display_slot.dropped} not displayed, {self.scheduler.summary()}, {self.motion_gate.summary()}).")
+
+    def stop(self):
+        self.stop_event.set()
+        self.wait()
+
+
+"""
+    This class handles face recognition for several capture sources.
+    Each source runs in its own worker process with its own compiled
+    model, so throughput scales with CPU cores. All workers feed one
+    shared identity matcher and one attendance writer in this process,
+    and the primary source is shown in the GUI.
+"""
+class MultiCameraRecognitionThread(QThread):
+    # Define signal for attendance
+    attendance_signal = pyqtSignal(str, str)
+
+    def __init__(self, matcher, model_path, model_bin, sources, display_size=(380, 480)):
+        super().__init__()
+        self.matcher = matcher
+        self.sources = list(sources)
+        self.display_slot = LatestSlot()
+        self.context = multiprocessing.get_context("spawn")
+        self.stop_event = self.context.Event()
+        self.encodings_queue = self.context.Queue()
+        self.identity_queues = [self.context.Queue() for _ in self.sources]
+        self.display_queue = self.context.Queue(maxsize=1)
+        self.workers = [
+            self.context.Process(
+                target=run_camera_worker, name=f"camera-{source_id}", daemon=True,
+                args=(source_id, source, model_path, model_bin, self.encodings_queue,
+                      self.identity_queues[source_id], self.display_queue if source_id == 0 else None,
+                      self.stop_event, (TARGET_LATENCY_MS, PROCESSING_UTILIZATION, MAX_PROCESS_FPS),
+                      (MOTION_SENSITIVITY, MOTION_PIXEL_DELTA, MOTION_REFRESH_SECONDS), display_size))
+            for source_id, source in enumerate(self.sources)
+        ]
+        # Last identity reported per live (source, track) so each track is recorded once
+        self.track_names = {}
+        self.attendance_writer = AttendanceWriter(on_result=self.on_attendance_result)
+
+    # Match the encodings sent by a worker and return the identities to it
+    def match_encodings(self, source_id, items, live_track_ids):
+        live_track_ids = set(live_track_ids)
+        for key in [key for key in self.track_names if key[0] == source_id and key[1] not in live_track_ids]:
+            del self.track_names[key]
+        matches = self.matcher.match([encoding for _, encoding in items])
+        resolved = []
+        for (track_id, _), (name, distance) in zip(items, matches):
+            resolved.append((track_id, name, distance))
+            key = (source_id, track_id)
+            if name != "Unknown" and self.track_names.get(key) != name:
+                self.track_names[key] = name
+                self.attendance_writer.submit(name, distance)
+        self.identity_queues[source_id].put(resolved)
+
+    # Persistence callback: report the outcome of an attendance event
+    def on_attendance_result(self, name, recorded):
+        self.attendance_signal.emit(name, "recorded" if recorded else "already recorded")
 
     def run(self):
-        skip_frames = 2 
-        frame_counter = 0
         try:
-            while self.running:
-                ret, frame = self.cap.read()
-                if not ret:
-                    logging.warning("Error: Could not read frame.")
+            self.attendance_writer.start()
+            for worker in self.workers:
+                worker.start()
+            logging.info(f"Started {len(self.workers)} camera workers")
+            while not self.stop_event.is_set():
+                try:
+                    self.match_encodings(*self.encodings_queue.get(timeout=0.05))
+                except queue.Empty:
+                    pass
+                try:
+                    self.display_slot.put(DisplayFrame(self.display_queue.get_nowait()))
+                except queue.Empty:
+                    pass
+                if not any(worker.is_alive() for worker in self.workers):
+                    logging.warning("All camera workers have stopped.")
                     break
-
-                # Skip frames based on the counter
-                frame_counter += 1
-                if frame_counter % (skip_frames + 1) != 0:
-                    continue 
-            
-                # Resize frame only if necessary
-                frame_resized = cv2.resize(frame, (672, 384))
-
-                # Prepare input data for inference
-                input_data = np.expand_dims(frame_resized.transpose(2, 0, 1), axis=0)
-
-                # Perform inference
-                results = self.compiled_model({self.input_blob: input_data})
-                detections = results[self.output_blob]
-
-                # Process the results
-                for obj in detections[0][0]:
-                    confidence = obj[2]
-                    if confidence < 0.5:  # Early exit for low confidence
-                        continue
-                    xmin = int(obj[3] * frame.shape[1])
-                    ymin = int(obj[4] * frame.shape[0])
-                    xmax = int(obj[5] * frame.shape[1])
-                    ymax = int (obj[6] * frame.shape[0])
-
-                    # Skip small or invalid regions
-                    if (xmax - xmin) < 20 or (ymax - ymin) < 20:
-                        continue
-
-                    # Extract and validate the face ROI
-                    face_roi = frame[ymin:ymax, xmin:xmax]
-                    if face_roi.size == 0:
-                        continue
-
-                    # Process encodings only if face ROI is valid
-                    face_encodings = face_recognition.face_encodings(cv2.cvtColor(face_roi, cv2.COLOR_BGR2RGB))
-                    if face_encodings:
-                        face_encoding = face_encodings[0]
-                        matches = face_recognition.compare_faces(self.known_face_encodings, face_encoding)
-                        name = "Unknown"
-                        if True in matches:
-                            first_match_index = matches.index(True)
-                            name = self.known_face_names[first_match_index]
-                            if self.db.db_record_attendance(name):
-                                logging.info(f"Attendance recorded for {name}")
-                                self.attendance_signal.emit(name, "recorded")
-                            else:
-                                logging.info(f"Attendance already recorded for {name} today")
-                                self.attendance_signal.emit(name, "already recorded")
-                        
-                        # Annotate the frame
-                        cv2.rectangle(frame, (xmin, ymin), (xmax, ymax), (111, 218, 156), 2)
-                        cv2.putText(frame, name, (xmin, ymin - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (111, 218, 156), 2)
-
-                # Emit the frame
-                self.frame_signal.emit(frame)
-                
         except Exception as e:
             logging.error(f"An error occurred during execution: {e}")
 
         finally:
-            self.cap.release()
-            logging.info("Resources released, application closed.")
+            self.stop_event.set()
+            for worker in self.workers:
+                worker.join(timeout=5)
+                if worker.is_alive():
+                    worker.terminate()
+            # Match what the workers sent before stopping, then flush the writer
+            while True:
+                try:
+                    self.match_encodings(*self.encodings_queue.get_nowait())
+                except queue.Empty:
+                    break
+            self.attendance_writer.stop()
+            for pending_queue in [self.encodings_queue, self.display_queue, *self.identity_queues]:
+                pending_queue.cancel_join_thread()
+            logging.info("Camera workers stopped, resources released.")
 
     def stop(self):
-        self.running = False
-        self.wait()
\ No newline at end of file
+        self.stop_event.set()
+        self.wait()
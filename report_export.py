@@ -0,0 +1,113 @@
+import csv
+import logging
+import os
+from PyQt6.QtCore import QThread, pyqtSignal
+from DB_management import DBmanagement
+from reporting import REPORT_COLUMNS, ReportEngine
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+# Formats offered in the admin panel and the optional package each one needs
+EXPORT_FORMATS = ("xlsx", "csv", "parquet")
+OPTIONAL_PACKAGES = {"xlsx": "XlsxWriter", "parquet": "pyarrow"}
+CHUNK_SIZE = 1000
+
+"""
+    This class exports the attendance report on a background thread.
+    Rows are streamed from the report engine in chunks and written as
+    they arrive (xlsx in constant-memory mode, CSV, or Parquet row
+    groups), so memory use does not grow with the history and the
+    admin window stays responsive. Progress is reported after every
+    chunk.
+"""
+class ReportExportThread(QThread):
+    # Define signals for progress (rows written, total rows), success (path) and failure (message)
+    progress_signal = pyqtSignal(int, int)
+    finished_signal = pyqtSignal(str)
+    failed_signal = pyqtSignal(str)
+
+    def __init__(self, report_path, export_format="xlsx", chunk_size=CHUNK_SIZE):
+        super().__init__()
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported report format: {export_format}")
+        self.report_path = report_path
+        self.export_format = export_format
+        self.chunk_size = chunk_size
+
+    def run(self):
+        # This thread gets its own SQLite connection from the pool
+        db = DBmanagement()
+        # Written next to the target and renamed at the end, so a failed export leaves no partial report
+        partial_path = f"{self.report_path}.part"
+        try:
+            engine = ReportEngine(db)
+            total = engine.row_count()
+            chunks = self.iter_chunks(engine.iter_report(chunk_size=self.chunk_size), total)
+            getattr(self, f"write_{self.export_format}")(partial_path, chunks)
+            os.replace(partial_path, self.report_path)
+            logging.info(f"Report with {total} students written to {self.report_path}")
+            self.finished_signal.emit(self.report_path)
+        except ImportError as e:
+            logging.error(f"Exporting {self.export_format} reports needs the {OPTIONAL_PACKAGES[self.export_format]} package: {e}")
+            self.failed_signal.emit(f"Install {OPTIONAL_PACKAGES[self.export_format]}")
+        except Exception as e:
+            logging.error(f"Error exporting the report: {e}")
+            self.failed_signal.emit("Report failed")
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            db.db_close()
+
+    # Group the report rows in chunks and report the progress after each one
+    def iter_chunks(self, rows, total):
+        chunk = []
+        written = 0
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == self.chunk_size:
+                yield chunk
+                written += len(chunk)
+                self.progress_signal.emit(written, total)
+                chunk = []
+        if chunk:
+            yield chunk
+            written += len(chunk)
+        self.progress_signal.emit(written, total)
+
+    # Write the rows to an Excel workbook; constant_memory flushes every row to disk once written
+    def write_xlsx(self, path, chunks):
+        import xlsxwriter
+        workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+        try:
+            sheet = workbook.add_worksheet("Attendance")
+            sheet.write_row(0, 0, REPORT_COLUMNS)
+            row_index = 1
+            for chunk in chunks:
+                for row in chunk:
+                    sheet.write_row(row_index, 0, row)
+                    row_index += 1
+        finally:
+            workbook.close()
+
+    # Write the rows to a CSV file
+    def write_csv(self, path, chunks):
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(REPORT_COLUMNS)
+            for chunk in chunks:
+                writer.writerows(chunk)
+
+    # Write the rows to a Parquet file, one row group per chunk, with the dates as a list column
+    def write_parquet(self, path, chunks):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        schema = pa.schema([("student_name", pa.string()), ("attendance_count", pa.int64()),
+                            ("last_seen", pa.string()), ("dates", pa.list_(pa.string()))])
+        with pq.ParquetWriter(path, schema) as writer:
+            for chunk in chunks:
+                names, counts, last_seen, dates = zip(*chunk)
+                dates = [value.split(" ; ") if value else [] for value in dates]
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(names), pa.array(counts, pa.int64()), pa.array(last_seen, pa.string()), pa.array(dates, schema.field("dates").type)],
+                    schema=schema))
@@ -0,0 +1,59 @@
+import logging
+from DB_management import DBmanagement
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+# Columns of every report row
+REPORT_COLUMNS = ("student_name", "attendance_count", "last_seen", "dates")
+
+"""
+    This class builds the attendance reports inside SQLite. The full
+    report is read from the trigger-maintained attendance summary; a
+    report over a date range is aggregated per student from the
+    (student_id, date) index with COUNT, MAX and group_concat. Rows are yielded in student name order and can be
+    paged by name, so no caller has to load the attendance history.
+"""
+class ReportEngine:
+    def __init__(self, db=None):
+        self.db = db or DBmanagement()
+
+    # Return the names of all students in name order
+    def student_names(self):
+        students = self.db.db_get_students() or []
+        return [student[1] for student in students]
+
+    # Return the number of rows of the full report (one per student)
+    def row_count(self):
+        rows = self.db.db_execute('SELECT COUNT(*) FROM students', fetch=True)
+        return rows[0][0] if rows else 0
+
+    # Yield (student_name, attendance_count, last_seen, dates) rows in name order after after_name
+    # (use_summary=False aggregates the whole history instead of reading the summary table)
+    def iter_report(self, student=None, date_from=None, date_to=None, after_name=None, limit=None,
+                    use_summary=True, chunk_size=500):
+        conditions, params = ['s.name > ?'], [after_name or '']
+        if student:
+            conditions.append('s.name = ?')
+            params.append(student)
+        if date_from or date_to or not use_summary:
+            # Each student's dates are read in order from the (student_id, date) index
+            in_range = 'student_id = s.id AND date >= ? AND date <= ?'
+            query = f'''SELECT s.name, (SELECT COUNT(*) FROM attendance WHERE {in_range}),
+                               (SELECT MAX(date) FROM attendance WHERE {in_range}),
+                               COALESCE((SELECT group_concat(date, ' ; ') FROM
+                                         (SELECT date FROM attendance WHERE {in_range} ORDER BY date)), '')
+                        FROM students s WHERE {' AND '.join(conditions)} ORDER BY s.name'''
+            params = [date_from or '', date_to or '9999-12-31'] * 3 + params
+        else:
+            query = f'''SELECT s.name, m.attendance_count, m.last_seen, m.dates
+                        FROM students s JOIN attendance_summary m ON m.student_id = s.id
+                        WHERE {' AND '.join(conditions)} ORDER BY s.name'''
+        if limit:
+            query += ' LIMIT ?'
+            params.append(limit)
+        yield from self.db.db_iter_query(query, params, chunk_size)
+
+    # Return the report rows as a list
+    def report_rows(self, **filters):
+        return list(self.iter_report(**filters))
@@ -0,0 +1,61 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import DB_management
+from DB_management import DBmanagement
+
+"""
+    These tests run the student database against a temporary file, so
+    the schema, its triggers and the attendance cache are exercised the
+    way the application uses them.
+"""
+class DBmanagementTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = DB_management.DB_STUDENT_PATH
+        DB_management.DB_STUDENT_PATH = os.path.join(self.tmp_dir.name, "students.db")
+        DBmanagement.recorded_today = set()
+        DBmanagement.recorded_date = None
+        self.db = DBmanagement()
+        self.db.db_students_init()
+
+    def tearDown(self):
+        self.db.db_close()
+        DB_management.DB_STUDENT_PATH = self.db_path
+        self.tmp_dir.cleanup()
+
+    # Return the student names and the attendance dates per student
+    def attendance(self):
+        rows = self.db.db_execute('''SELECT s.name, a.date FROM students s LEFT JOIN attendance a
+                                     ON a.student_id = s.id ORDER BY s.name, a.date''', fetch=True)
+        dates = {}
+        for name, date in rows:
+            dates.setdefault(name, [])
+            if date is not None:
+                dates[name].append(date)
+        return dates
+
+    def test_add_students_counts_inserted_and_skipped(self):
+        # The summary triggers change more rows than the inserted students
+        self.assertEqual(self.db.db_add_students(["A", "B", "A", "C"]), (3, 1))
+        self.assertEqual(self.db.db_add_students(["A", "D"]), (1, 1))
+
+    def test_rename_to_same_name_keeps_student(self):
+        self.db.db_record_manual_attendance("alice", "2024-01-02")
+        self.db.db_record_manual_attendance("bob", "2024-01-03")
+        self.db.db_update_student("alice", "alice")
+        self.assertEqual(self.attendance(), {"alice": ["2024-01-02"], "bob": ["2024-01-03"]})
+
+    def test_rename_onto_existing_student_merges_attendance(self):
+        self.db.db_record_manual_attendance("alice", "2024-01-02")
+        self.db.db_record_manual_attendance("alice", "2024-01-03")
+        self.db.db_record_manual_attendance("bob", "2024-01-03")
+        self.db.db_update_student("alice", "bob")
+        self.assertEqual(self.attendance(), {"bob": ["2024-01-02", "2024-01-03"]})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import logging
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+"""
+    This class holds one tracked face: its latest box and the identity
+    resolved for it so far.
+"""
+class Track:
+    __slots__ = ("track_id", "box", "name", "distance", "misses", "frames_since_encode", "retry_interval", "pending")
+
+    def __init__(self, track_id, box, retry_interval):
+        self.track_id = track_id
+        self.box = box
+        self.name = None
+        self.distance = float("inf")
+        self.misses = 0
+        self.frames_since_encode = 0
+        # Frames to wait before re-encoding while the identity is uncertain
+        self.retry_interval = retry_interval
+        # Set while an encoding of this track is being matched elsewhere
+        self.pending = False
+
+"""
+    This class associates the detector boxes across frames by IoU and
+    assigns them track ids, so a face only has to be encoded when its
+    track is new or its identity is still uncertain.
+"""
+class FaceTracker:
+    def __init__(self, iou_threshold=0.3, max_misses=5, confident_distance=0.45, retry_interval=3, max_retry_interval=48):
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        # Tracks matched further than this are re-encoded after retry_interval frames,
+        # doubling the wait after each unconfident retry up to max_retry_interval
+        self.confident_distance = confident_distance
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self.tracks = []
+        self.next_track_id = 1
+
+    # Compute the IoU matrix between two sets of (xmin, ymin, xmax, ymax) boxes
+    def iou(self, boxes_a, boxes_b):
+        a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+        b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+        ix = np.clip(np.minimum(a[:, None, 2], b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0]), 0, None)
+        iy = np.clip(np.minimum(a[:, None, 3], b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1]), 0, None)
+        intersection = ix * iy
+        area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+        area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+        return intersection / np.maximum(area_a[:, None] + area_b[None, :] - intersection, 1e-6)
+
+    # Associate the boxes of a new frame with the tracks and return one track per box
+    def update(self, boxes):
+        assigned = [None] * len(boxes)
+        matched_tracks = set()
+        if self.tracks and len(boxes):
+            overlap = self.iou([track.box for track in self.tracks], boxes)
+            # Greedy association, best overlaps first
+            for flat in np.argsort(overlap, axis=None)[::-1]:
+                track_index, box_index = np.unravel_index(flat, overlap.shape)
+                if overlap[track_index, box_index] < self.iou_threshold:
+                    break
+                if track_index in matched_tracks or assigned[box_index] is not None:
+                    continue
+                matched_tracks.add(track_index)
+                assigned[box_index] = self.tracks[track_index]
+
+        survivors = []
+        for track_index, track in enumerate(self.tracks):
+            if track_index in matched_tracks:
+                track.misses = 0
+                survivors.append(track)
+            else:
+                track.misses += 1
+                if track.misses <= self.max_misses:
+                    survivors.append(track)
+
+        for box_index, box in enumerate(boxes):
+            track = assigned[box_index]
+            if track is None:
+                track = Track(self.next_track_id, box, self.retry_interval)
+                self.next_track_id += 1
+                survivors.append(track)
+            track.box = box
+            track.frames_since_encode += 1
+            assigned[box_index] = track
+        self.tracks = survivors
+        return assigned
+
+    # Check if a track has to be (re-)encoded
+    def needs_encoding(self, track):
+        if track.pending:
+            return False
+        if track.name is None:
+            return True
+        return track.distance > self.confident_distance and track.frames_since_encode >= track.retry_interval
+
+    # Store a match result on a track and return True if its identity changed to a known student
+    def resolve(self, track, name, distance):
+        retried = track.name is not None
+        track.frames_since_encode = 0
+        track.pending = False
+        changed = False
+        # A retry only replaces the identity with a closer match
+        if not retried or name == track.name or distance < track.distance:
+            changed = name != track.name
+            track.name = name
+            track.distance = distance
+        if retried and track.distance > self.confident_distance:
+            track.retry_interval = min(track.retry_interval * 2, self.max_retry_interval)
+        if changed and name != "Unknown":
+            logging.info(f"Track {track.track_id} identified as {name} (distance {distance:.3f})")
+            return True
+        return False
@@ -1,9 +1,14 @@
+import csv
+import hashlib
+import io
+import json
 import os
 import subprocess
-from flask import Flask, render_template
+from datetime import datetime
+from flask import Flask, Response, abort, render_template, request, stream_with_context
 import logging
 from DB_management import DBmanagement
-import pandas as pd
+from reporting import REPORT_COLUMNS, ReportEngine
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
@@ -11,6 +16,10 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(me
 # Initialize Flask app
 app = Flask(__name__)
 
+# Rows per page of the JSON endpoints
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+
 # Function to get student data from the database
 def get_student_data():
     try:
@@ -21,24 +30,43 @@ def get_student_data():
         logging.error(f"Error getting student data: {e}")
         return []
 
-# Function to generate report data from the attendance records
-def generate_report_data():
+# Function to read the page size and filters of an API request (400 on invalid values)
+def request_filters(default_limit):
     try:
-        db = DBmanagement()  # Initialize database management object
-        attendance_data = db.db_get_attendance()  # Get attendance data from the database
-        dataFrame = pd.DataFrame(attendance_data, columns=['student_name', 'date'])  # Create DataFrame from attendance data
-        dataFrame['date'] = dataFrame['date'].fillna("")  # Fill NaN dates with empty strings
-        groupData = dataFrame.groupby('student_name').agg({
-            'date': [lambda x: max(0, len(x) - 1), lambda x: list(x)]  # Aggregate data by student name
-        }).reset_index()
-        groupData.columns = ['student_name', 'attendance_count', 'dates']  # Rename columns
-        report_data = groupData.to_dict(orient='records')  # Convert DataFrame to list of dictionaries
-        for record in report_data:
-            record['dates'] = " ; ".join(record['dates'][1:])  # Join dates into a single string
-        return report_data
-    except Exception as e:
-        logging.error(f"An error occurred: {e}")
-        return []
+        limit = request.args.get('limit', type=int, default=default_limit)
+        if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        for key in ('date_from', 'date_to'):
+            if request.args.get(key):
+                datetime.strptime(request.args[key], "%Y-%m-%d")
+        return {'student': request.args.get('student') or None, 'date_from': request.args.get('date_from') or None,
+                'date_to': request.args.get('date_to') or None, 'limit': limit}
+    except ValueError as e:
+        abort(400, description=str(e))
+
+# Function to stream a response from a row generator; the ETag follows the database change counter
+# so unchanged reports are answered with 304 Not Modified
+def streamed_response(generate, mimetype):
+    version = DBmanagement().db_change_counter()
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    if version is not None:
+        query = hashlib.sha1(request.full_path.encode()).hexdigest()[:16]
+        response.set_etag(f"{version}-{query}")
+        response.headers['Cache-Control'] = 'no-cache'
+        response.make_conditional(request)
+    return response
+
+# Function to stream a JSON page of rows followed by the keyset of the next page
+def json_page(rows, limit, row_to_dict, next_key):
+    yield '{"rows": ['
+    count = 0
+    last = None
+    for row in rows:
+        yield (',' if count else '') + json.dumps(row_to_dict(row))
+        count += 1
+        last = row
+    # A full page may have more rows after it
+    yield '], "next": ' + json.dumps(next_key(last) if limit and count == limit else None) + '}'
 
 # Function to kill a process running on a specific port
 def kill_process_on_port(port):
@@ -52,20 +80,67 @@ def kill_process_on_port(port):
     except Exception as e:
         logging.error(f"An error occurred: {e}")
 
-# Route to display the report
+# Route to display the report; the rows are loaded page by page from /api/summary.json
 @app.route('/')
 def report():
     try:
-        report_data = generate_report_data()  # Generate report data
-        return render_template('index.html', report_data=report_data)  # Render the report in the template
+        return render_template('index.html', page_size=DEFAULT_PAGE_SIZE)
     except Exception as e:
         logging.error(f"An error occurred: {e}")
         return "An error occurred. Please check the logs."
 
+# Route to page through the per-student report:
+# ?after=<name>&limit=<n>&student=<name>&date_from=<YYYY-MM-DD>&date_to=<YYYY-MM-DD>
+@app.route('/api/summary.json')
+def summary_json():
+    filters = request_filters(DEFAULT_PAGE_SIZE)
+    after = request.args.get('after')
+    rows = ReportEngine().iter_report(filters['student'], filters['date_from'], filters['date_to'], after, filters['limit'])
+    return streamed_response(lambda: json_page(
+        rows, filters['limit'], lambda row: dict(zip(REPORT_COLUMNS, row)), lambda row: row[0]), 'application/json')
+
+# Route to page through the attendance records:
+# ?after_id=<id>&limit=<n>&student=<name>&date_from=<YYYY-MM-DD>&date_to=<YYYY-MM-DD>
+@app.route('/api/attendance.json')
+def attendance_json():
+    filters = request_filters(DEFAULT_PAGE_SIZE)
+    after_id = request.args.get('after_id', type=int, default=0)
+    rows = DBmanagement().db_iter_attendance(filters['student'], filters['date_from'], filters['date_to'],
+                                             after_id, filters['limit'])
+    return streamed_response(lambda: json_page(
+        rows, filters['limit'], lambda row: {'id': row[0], 'student_name': row[1], 'date': row[2]},
+        lambda row: row[0]), 'application/json')
+
+# Route to download the attendance records as CSV, with the same filters (all rows unless limit is given)
+@app.route('/api/attendance.csv')
+def attendance_csv():
+    filters = request_filters(None)
+    after_id = request.args.get('after_id', type=int, default=0)
+    rows = DBmanagement().db_iter_attendance(filters['student'], filters['date_from'], filters['date_to'],
+                                             after_id, filters['limit'])
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(['id', 'student_name', 'date'])
+        for count, row in enumerate(rows, 1):
+            writer.writerow(row)
+            # Send the buffered lines every few hundred rows
+            if count % 500 == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    response = streamed_response(generate, 'text/csv')
+    response.headers['Content-Disposition'] = 'attachment; filename=attendance.csv'
+    return response
+
 # Main entry point of the application
 if __name__ == '__main__':
     try:
         kill_process_on_port(6969)  # Kill any process running on port 6969
+        DBmanagement().db_students_init()  # Make sure the summary tables exist
         app.run(debug=True, port=6969)  # Run the Flask app on port 6969
     except Exception as e:
         logging.error(f"An error occurred: {e}")